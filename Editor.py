@@ -1,17 +1,20 @@
 import sys
 import os
+import argparse
 
 import pygame
 
 from src.Utilities import Utilities
 from src.TileMap import TileMap
 from src.Camera import Camera
+from src.LevelManifest import LevelManifest
+from src.EditJournal import EditJournal
 
 
 class Editor:
     """Level editor to help build maps for the game"""
-    def __init__(self):
-        """Initialize the editor"""
+    def __init__(self, level_id=None):
+        """Initialize the editor, edit level of the game with given id or the separate level file"""
         # Initialize pygame
         pygame.init()
 
@@ -63,13 +66,31 @@ class Editor:
         # Movement
         self.movement = [False, False, False, False]
 
+        # Levels of the game in the order they are played
+        self.levels = LevelManifest(os.path.join(self.utilities.BASE_PATH, "../dependencies/data"))
+        self.levels.update()
+        self.level_id = level_id
+        # Edited file
+        if level_id is None:
+            self.level_path = os.path.join(self.utilities.BASE_PATH, "../level.json")
+        else:
+            self.level_path = self.levels.path(level_id)
+
         # Load the level map if it exists
         try:
-            self.tile_map.load(os.path.join(self.utilities.BASE_PATH, "../level.json"))
+            self.tile_map.load(self.level_path)
         # Continue if file is not found
         except FileNotFoundError:
             pass
 
+        # Undo and redo history
+        self.journal = EditJournal(self.tile_map)
+        # Corners of the selected grid area, the second one follows the mouse until it's set
+        self.selection_start = None
+        self.selection_end = None
+        # Copied region
+        self.clipboard = None
+
         # FPS timer
         self.timer = pygame.time.Clock()
 
@@ -116,10 +137,13 @@ class Editor:
         # Handle left click
         if event.button == 1:
             self.click = True
+            # Everything placed until the button is released is undone at once
+            self.journal.begin()
         # Handle right click
         if event.button == 3:
             # Set right click to true, informing that user wants to delete something
             self.right_click = True
+            self.journal.begin()
 
     def _handle_scroll(self, event):
         """Handle scroll events"""
@@ -154,7 +178,7 @@ class Editor:
             pos = (self.mouse_pos[0] + self.camera.scroll[0], self.mouse_pos[1] +
                     self.camera.scroll[1])
             # Save them into JSON format
-            self.tile_map.deco_tile_map.append({"type": group, "variant": variant, "pos": pos})
+            self.tile_map.place_deco({"type": group, "variant": variant, "pos": pos})
 
     def _handle_mouseup(self, event):
         """Handle mouse button up events"""
@@ -164,6 +188,9 @@ class Editor:
         # User stopped clicking right button
         if event.button == 3:
             self.right_click = False
+        # Finish the stroke when both buttons are released
+        if not self.click and not self.right_click:
+            self.journal.end()
 
     def _handle_keydown(self, event):
         """Handle key down events"""
@@ -192,10 +219,82 @@ class Editor:
             self.shift = True
         # Turn on auto-tiling with f key (it is close to movement, so it's more comfortable)
         if event.key == pygame.K_f:
+            stroke = self.journal.recording
+            self.journal.begin()
             self.tile_map.auto_tile()
+            if not stroke:
+                self.journal.end()
+        # Toggle auto-tiling of every placed and removed tile with g key
+        if event.key == pygame.K_g:
+            self.tile_map.auto_tiling = not self.tile_map.auto_tiling
+            pygame.display.set_caption("Map Editor" + (" (auto-tiling)" if self.tile_map.auto_tiling else ""))
+        # Handle undo, redo and the bulk editing keys
+        self._handle_edit_keys(event)
         # Save the changes by clicking return (or enter)
         if event.key == pygame.K_RETURN:
-            self.tile_map.save(os.path.join(self.utilities.BASE_PATH, "../level.json"))
+            self.tile_map.save(self.level_path)
+            # Describe the changed level in the manifest
+            if self.level_id is not None:
+                self.levels.update()
+
+    def _handle_edit_keys(self, event):
+        """Handle keys of undo, redo, selection and bulk editing"""
+        control = event.mod & pygame.KMOD_CTRL
+        # Undo with control + z, redo with control + y, not in the middle of a stroke
+        if control and event.key == pygame.K_z and not self.journal.recording:
+            self.journal.undo()
+        if control and event.key == pygame.K_y and not self.journal.recording:
+            self.journal.redo()
+
+        # Start the selection with q, set its end with the second press and clear it with the third one
+        if event.key == pygame.K_q:
+            if not self.selection_start:
+                self.selection_start = self.tile_pos
+            elif not self.selection_end:
+                self.selection_end = self.tile_pos
+            else:
+                self.selection_start = self.selection_end = None
+
+        # Every bulk operation is undone at once, or with the stroke it was done in
+        stroke = self.journal.recording
+        self.journal.begin()
+        tile = (self.tile_list[self.tile_group], self.tile_variant)
+        # Fill the selection with the current tile with r, clear it with delete
+        if event.key in (pygame.K_r, pygame.K_DELETE) and self.selection_start:
+            self.tile_map.fill_rect(*self._selection(), tile if event.key == pygame.K_r else None)
+        # Flood fill the tiles connected to the hovered one with b, inside the selection or the view
+        if event.key == pygame.K_b:
+            self.tile_map.flood_fill(self.tile_pos, tile, self._selection() if self.selection_start else
+                                     self._view_bounds())
+        # Copy the selection with control + c and paste it at the hovered tile with control + v
+        if control and event.key == pygame.K_c and self.selection_start:
+            self.clipboard = self.tile_map.copy_region(*self._selection())
+        if control and event.key == pygame.K_v and self.clipboard:
+            self.tile_map.paste_region(self.clipboard, self.tile_pos)
+        if not stroke:
+            self.journal.end()
+
+    def _selection(self):
+        """Return selected grid area as inclusive range (left, top, right, bottom)"""
+        end = self.selection_end or self.tile_pos
+        return (min(self.selection_start[0], end[0]), min(self.selection_start[1], end[1]),
+                max(self.selection_start[0], end[0]), max(self.selection_start[1], end[1]))
+
+    def _view_bounds(self):
+        """Return grid area visible on the screen as inclusive range (left, top, right, bottom)"""
+        return (int(self.camera.scroll[0] // self.tile_map.size), int(self.camera.scroll[1] // self.tile_map.size),
+                int((self.camera.scroll[0] + self.display.get_width()) // self.tile_map.size),
+                int((self.camera.scroll[1] + self.display.get_height()) // self.tile_map.size))
+
+    def _draw_selection(self):
+        """Draw outline of the selected area"""
+        if not self.selection_start:
+            return
+        left, top, right, bottom = self._selection()
+        pygame.draw.rect(self.display, (255, 255, 255),
+                         (left * self.tile_map.size - self.camera.scroll[0],
+                          top * self.tile_map.size - self.camera.scroll[1],
+                          (right - left + 1) * self.tile_map.size, (bottom - top + 1) * self.tile_map.size), 1)
 
     def _handle_keyup(self, event):
         """Handle key up events"""
@@ -225,6 +324,8 @@ class Editor:
 
         # Draw current tile
         self._draw_current_tile()
+        # Draw the selected area
+        self._draw_selection()
 
         # Scale and blit the rendering surface to the main one
         self.surface.blit(
@@ -237,6 +338,9 @@ class Editor:
         """Update position of things"""
         # Update camera scroll
         self.camera.update_scroll_editor(self.movement)
+        # Stream chunks of large levels around the middle of the view
+        self.tile_map.stream((self.camera.scroll[0] + self.display.get_width() / 2,
+                              self.camera.scroll[1] + self.display.get_height() / 2))
         # Update mouse position
         self._get_mouse_pos()
         # Update tiles
@@ -267,8 +371,6 @@ class Editor:
         else:
             self.display.blit(self.tile_image, self.mouse_pos)
 
-        # Place the tiles
-        self._place_tiles()
         self.display.blit(self.tile_image, (5, 5))
 
     def _place_tiles(self):
@@ -279,33 +381,19 @@ class Editor:
             group = self.tile_list[self.tile_group]
             variant = self.tile_variant
             pos = self.tile_pos
-            # Format the index
-            formatted_index = str(self.tile_pos[0]) + ';' + str(self.tile_pos[1])
-            self.tile_map.tile_map[formatted_index] = {"type": group, "variant": variant,
-                                                       "pos": pos}
+            self.tile_map.place_tile(pos, group, variant)
         # Remove the tiles on right click
         if self.right_click:
             self._remove_tiles()
 
     def _remove_tiles(self):
         """Remove the existing tiles on right click"""
-        # Write location as JSON position
-        tile_location = str(self.tile_pos[0]) + ';' + str(self.tile_pos[1])
         # If it's on grid, delete it
-        if tile_location in self.tile_map.tile_map:
-            del self.tile_map.tile_map[tile_location]
-        # Delete the off-grid tiles
-        for tile in self.tile_map.deco_tile_map.copy():
-            # Save the image of current tile
-            tile_img = self.assets[tile["type"]][tile["variant"]]
-            # Calculate its position in the world
-            rect_x = tile["pos"][0] - self.camera.scroll[0]
-            rect_y = tile["pos"][1] - self.camera.scroll[1]
-            # Create a rectangle for collision detection
-            tile_rect = pygame.Rect(rect_x, rect_y, tile_img.get_width(), tile_img.get_height())
-            # If mouse collides with tile, delete it
-            if tile_rect.collidepoint(self.mouse_pos):
-                self.tile_map.deco_tile_map.remove(tile)
+        self.tile_map.remove_tile(self.tile_pos)
+        # Delete the off-grid tiles under the mouse
+        mouse_pos = (self.mouse_pos[0] + self.camera.scroll[0], self.mouse_pos[1] + self.camera.scroll[1])
+        for tile in self.tile_map.query_point(mouse_pos):
+            self.tile_map.remove_deco(tile)
 
     def _get_mouse_pos(self):
         """Get mouse position"""
@@ -316,6 +404,10 @@ class Editor:
 
 # Only run using this file
 if __name__ == "__main__":
+    # Edit level of the game if its id is given
+    parser = argparse.ArgumentParser(description="Level editor of Pytformer")
+    parser.add_argument("--level", type=int, help="id of the game's level to edit, in the order of the manifest")
+    arguments = parser.parse_args()
     # Create
-    editor = Editor()
+    editor = Editor(arguments.level)
     editor.run()
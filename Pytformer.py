@@ -2,23 +2,44 @@ import math
 import sys
 import os
 import random
+import time
+import argparse
 
 import pygame
 
 from src.Entities import Player, Enemy
+from src.EntityStore import EntityStore
 from src.Utilities import Utilities
 from src.TileMap import TileMap
+from src.SpatialHash import SpatialHash
 from src.Camera import Camera
 from src.Clouds import Clouds
 from src.Animation import Animation
-from src.Particle import Particle
-from src.Spark import Spark
+from src.AudioManager import AudioManager
+from src.Outline import Outline
+from src.Transition import Transition
+from src.ParticleSystem import ParticleSystem
+from src.SparkSystem import SparkSystem
+from src.ProjectileSystem import ProjectileSystem
+from src.LevelManifest import LevelManifest
 
 
 class Pytformer:
     """Pytformer - a Python platformer"""
-    def __init__(self):
+    # Length of one simulation step (60 steps a second)
+    STEP = 1 / 60
+    # Maximum number of steps simulated before drawing a frame
+    MAX_STEPS = 5
+
+    def __init__(self, headless=False):
         """Initialize the game"""
+        # Headless mode, without a window and sounds
+        self.headless = headless
+        # Use SDL's dummy drivers, they need to be set before pygame initializes
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
+
         # Initialize pygame
         pygame.init()
 
@@ -31,6 +52,10 @@ class Pytformer:
         self.display = pygame.Surface((320, 240), pygame.SRCALPHA)
         # Surface without background
         self.display_2 = pygame.Surface((320, 240))
+        # Outline of everything on the render help display
+        self.outline = Outline(self.display.get_size())
+        # Level transition frames
+        self.transition_frames = Transition(self.display.get_size())
         # Game utilities
         self.utilities = Utilities()
 
@@ -71,32 +96,34 @@ class Pytformer:
             }
         }
 
-        sound_path = "../dependencies/sounds/"
+        # Gun of enemies facing left, flipped once
+        self.assets["gun_flipped"] = pygame.transform.flip(self.assets["gun"], True, False)
 
-        # Sound effects
-        self.sound_effects = {
-            "jump": pygame.mixer.Sound(os.path.join(self.utilities.BASE_PATH, sound_path + "jump.flac")),
-            "dash": pygame.mixer.Sound(os.path.join(self.utilities.BASE_PATH, sound_path + "dash.wav")),
-            "hit": pygame.mixer.Sound(os.path.join(self.utilities.BASE_PATH, sound_path + "hit.mp3")),
-            "shoot": pygame.mixer.Sound(os.path.join(self.utilities.BASE_PATH, sound_path + "shoot.mp3")),
-            "ambience": pygame.mixer.Sound(os.path.join(self.utilities.BASE_PATH, sound_path + "ambience.mp3"))
-        }
+        # Music and sound effects, headless mode doesn't load or play them
+        self.audio = AudioManager(self.utilities.BASE_PATH, not headless)
 
-        # Adjust volumes
-        self.sound_effects["jump"].set_volume(0.8)
-        self.sound_effects["dash"].set_volume(0.9)
-        self.sound_effects["hit"].set_volume(0.9)
-        self.sound_effects["shoot"].set_volume(0.5)
-        self.sound_effects["ambience"].set_volume(0.2)
+        # Particles, leafs sway so it seems like they float
+        self.particles = ParticleSystem(self.assets["particles"], {"leaf": (0.03, 0.3)})
+        # Sparks
+        self.sparks = SparkSystem()
+        # Projectiles
+        self.projectiles = ProjectileSystem(self.assets["bullet"])
+        # Broadphase of everything that moves, built every frame for interactions between them
+        self.broadphase = SpatialHash(32)
 
         # Create player
         self.player = Player(self, (100, 100), (8, 15))
+        # Enemies
+        self.enemies = EntityStore()
         # Clouds
         self.clouds = Clouds(self.assets["clouds"])
 
         # Create tile map
         self.tile_map = TileMap(self)
 
+        # Levels in the order they are played, refreshed if their files changed
+        self.levels = LevelManifest(os.path.join(self.utilities.BASE_PATH, "../dependencies/data"))
+        self.levels.update()
         # Current level
         self.level = 0
         # Load it
@@ -108,24 +135,42 @@ class Pytformer:
         # FPS timer
         self.timer = pygame.time.Clock()
 
-    def run(self):
-        """Run the game"""
+    def run(self, fps=0):
+        """Run the game, simulate it in fixed steps and draw it as often as fps allows (0 is uncapped)"""
+        # Time not simulated yet
+        accumulator = 0
+        previous_time = time.perf_counter()
         # Game loop
         while True:
             # Handle the events
             self._get_events()
 
-            # Update the music
-            self._update_music()
-
-            # Update the surface
-            self._update_surface()
-
-            # Update positions
+            # Gather the time since the last frame
+            current_time = time.perf_counter()
+            accumulator += current_time - previous_time
+            previous_time = current_time
+
+            # Update positions in fixed steps, catch up at most few steps, so one hitch can't spiral
+            steps = 0
+            while accumulator >= self.STEP and steps < self.MAX_STEPS:
+                self._update_pos()
+                accumulator -= self.STEP
+                steps += 1
+            # Drop the time that couldn't be caught up
+            accumulator = min(accumulator, self.STEP)
+
+            # Update the surface, between the last two steps
+            self._update_surface(accumulator / self.STEP)
+
+            # Limit the frame rate
+            self.timer.tick(fps)
+
+    def simulate(self, frames):
+        """Step the simulation given number of frames as fast as possible, return the time it took"""
+        start = time.perf_counter()
+        for frame in range(frames):
             self._update_pos()
-
-            # Run the game in 60 FPS
-            self.timer.tick(60)
+        return time.perf_counter() - start
 
     def _get_events(self):
         """Get the input events"""
@@ -142,6 +187,8 @@ class Pytformer:
             # Handle keyup events
             if event.type == pygame.KEYUP:
                 self._handle_keyup_events(event)
+            # Handle audio events
+            self.audio.handle_event(event)
 
     def _handle_keydown_events(self, event):
         """Handle keydown events"""
@@ -159,7 +206,7 @@ class Pytformer:
         # Jump
         if event.key == pygame.K_UP or event.key == pygame.K_w:
             if self.player.jump():
-                self.sound_effects["jump"].play()
+                self.audio.play("jump")
         # Dash
         if event.key == pygame.K_x or event.key == pygame.K_l:
             self.player.dash()
@@ -173,8 +220,12 @@ class Pytformer:
         if event.key == pygame.K_RIGHT or event.key == pygame.K_d:
             self.movement[1] = False
 
-    def _update_surface(self):
-        """Update the surface"""
+    def _update_surface(self, alpha=1):
+        """Update the surface, draw things alpha of the way from the previous step to the last one"""
+        # Camera scroll between the steps, rounded once so the tiles and the sprites line up
+        scroll = self.camera.render_scroll(alpha)
+        scroll = (round(scroll[0]), round(scroll[1]))
+
         # Fill the outline display
         self.display.fill((0, 0, 0, 0))
 
@@ -182,30 +233,30 @@ class Pytformer:
         self.display_2.blit(self.assets["background"], (0, 0))
         self.clouds.draw(self.display_2)
 
-        # Draw the tile map
-        self.tile_map.draw(self.display, self.camera.scroll)
+        # Draw the tile map, start the outline with it
+        self.tile_map.draw(self.display, scroll)
+        self.outline.begin(self.tile_map, self.display, scroll)
 
         # Draw the enemies
-        self._draw_enemies()
+        self.enemies.draw(self.display, scroll, self.outline, alpha)
 
         # Draw the player if he exists
         if not self.death:
-            self.player.draw(self.display, self.camera.scroll)
+            self.player.draw(self.display, scroll, self.outline, alpha)
 
-        # Draw and update particles
-        self._draw_particles()
+        # Draw the particles
+        self._draw_particles(scroll, alpha)
 
         # Draw projectiles
-        self._draw_projectiles()
+        self._draw_projectiles(scroll, alpha)
 
-        # Draw and update sparks
-        self._draw_sparks()
+        # Draw the sparks, only their region is checked for the outline
+        sparks_rect = self.sparks.draw(self.display, scroll, alpha)
+        if sparks_rect:
+            self.outline.add_region(self.display, sparks_rect)
 
-        # Create a mask
-        display_mask = pygame.mask.from_surface(self.display)
-        display_silhouette = display_mask.to_surface(setcolor=(0, 0, 0, 180), unsetcolor=(0, 0, 0, 0))
-        for offset in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            self.display_2.blit(display_silhouette, offset)
+        # Draw outlines of everything
+        self._draw_outline()
 
         # Draw the transition if needed
         self._draw_transition()
@@ -219,16 +270,10 @@ class Pytformer:
         # Update the display surface
         pygame.display.update()
 
-    def _update_music(self):
-        """Update the music"""
-        # Load and update the music and loop it
-        pygame.mixer.music.load(os.path.join(self.utilities.BASE_PATH,
-                                             "../dependencies/sounds/music/basic.wav"))
-        pygame.mixer.music.set_volume(1)
-        pygame.mixer.music.play(-1)
-
-        # Load and update the ambience sounds, loop it
-        # self.sound_effects["ambience"].play(-1)
+    def _draw_outline(self):
+        """Draw the outline of everything on display below it"""
+        # Silhouette is gathered while drawing, so only the outline is drawn here
+        self.outline.draw(self.display_2)
 
     def _update_pos(self):
         """Update positions of things"""
@@ -238,6 +283,10 @@ class Pytformer:
         # Update camera scroll
         self.camera.update_scroll(self.display)
 
+        # Stream chunks of large levels around the middle of the view
+        self.tile_map.stream((self.camera.scroll[0] + self.display.get_width() / 2,
+                              self.camera.scroll[1] + self.display.get_height() / 2))
+
         # Spawn leafs
         self._spawn_leafs()
 
@@ -247,121 +296,143 @@ class Pytformer:
         # Update clouds
         self.clouds.update()
 
+        # Index everything that moves for the interactions
+        self._update_broadphase()
+
+        # Update the enemies
+        self._update_enemies()
+
+        # Update the particles
+        self._update_particles()
+
+        # Update the projectiles
+        self._update_projectiles()
+
+        # Update the sparks
+        self._update_sparks()
+
     def _load_level(self, level_id):
         """Load level with given id"""
-        self.tile_map.load(os.path.join(self.utilities.BASE_PATH, "../dependencies/data/level")
-                           + str(level_id) + ".json")
-        # Particles
-        self.particles = []
-        # Projectiles
-        self.projectiles = []
-        # Sparks
-        self.sparks = []
+        # Refresh the manifest if the level file changed since it was read (like saved by the editor meanwhile)
+        if not self.levels.validate(level_id):
+            self.levels.update()
+        self.tile_map.load(self.levels.path(level_id))
 
         # Leaf particle spawners - the trees
         self.leaf_spawners = []
         # Set the leaf spawners
         self._set_leaf_spawners()
 
-        # Enemies
-        self.enemies = []
-
         # Set up entity spawners
         self._set_entity_spawners()
 
+        # Remember state of the loaded level, restarting it doesn't need the file anymore
+        self.tile_map.snapshot()
+        self._restart_level()
+
+    def _restart_level(self):
+        """Restart the current level from the state it was loaded in"""
+        # Undo changes of the tile map
+        self.tile_map.restore()
+        # Particles
+        self.particles.clear()
+        # Projectiles
+        self.projectiles.clear()
+        # Sparks
+        self.sparks.clear()
+        # Music, it keeps playing if the level uses the same track
+        self.audio.play_music("basic")
+
+        # Move the player to the spawn
+        if self.player_spawn:
+            self.player.teleport(self.player_spawn)
+            # Reset the air time on death
+            self.player.air_time = 0
+        # Spawn all enemies at once
+        self.enemies.clear()
+        self.enemies.spawn_many(self, Enemy, self.enemy_spawns, (8, 18))
+        # Load chunks of streamed levels around the player before the level starts
+        self.tile_map.stream(self.player.rect().center, True)
+
         # Death count
         self.death = 0
 
         # Level transition
         self.transition = -30
 
-    def _draw_particles(self):
-        """Update and draw particles"""
-        # Go through each particle that is active
-        for particle in self.particles.copy():
-            # Update the particle, store if it was the last frame
-            end = particle.update()
-            # Draw it
-            particle.draw(self.display, self.camera.scroll)
-            # If it was leaf, update its position, so it seems like it floats
-            if particle.type == "leaf":
-                particle.pos[0] += math.sin(particle.animation.frame * 0.03) * 0.3
-            # If it was the last frame and particle is not active, delete it
-            if end:
-                self.particles.remove(particle)
-
-    def _draw_sparks(self):
-        """Update and draw sparks"""
-        # Go through every spark
-        for spark in self.sparks.copy():
-            # Update it, save if this was the last frame
-            end = spark.update()
-            # Draw it
-            spark.draw(self.display, self.camera.scroll)
-            # If this was the last frame, remove the spark
-            if end:
-                self.sparks.remove(spark)
-
-    def _draw_projectiles(self):
-        """Draw the projectiles"""
-        # Go through every projectile (format: [[x, y], direction, timer])
-        for projectile in self.projectiles.copy():
-            # Add direction to the position - update position
-            projectile[0][0] += projectile[1]
-            # Increase the timer
-            projectile[2] += 1
-
-            image = self.assets["bullet"]
-            # Display the projectile in correct place in the world
-            self.display.blit(image, (projectile[0][0] - image.get_width() / 2 - self.camera.scroll[0],
-                                      projectile[0][1] - image.get_height() / 2 - self.camera.scroll[1]))
-            # If projectile hit the solid surface, remove it
-            if self.tile_map.solid_check(projectile[0]):
-                self.projectiles.remove(projectile)
-                # Create sparks
+    def _update_particles(self):
+        """Update the particles, remove the finished ones"""
+        self.particles.update()
+
+    def _draw_particles(self, scroll, alpha=1):
+        """Draw the particles"""
+        self.particles.draw(self.display, scroll, self.outline, alpha)
+
+    def _update_sparks(self):
+        """Update the sparks, remove the stopped ones"""
+        self.sparks.update()
+
+    def _update_projectiles(self):
+        """Update the projectiles, create sparks where they hit"""
+        # Player can be hit only if he isn't dashing
+        target = self.player.rect() if abs(self.player.dashing) < 50 else None
+        hits_x, hits_y, directions, player_hits = self.projectiles.update(self.tile_map.solidity, self.tile_map.size,
+                                                                          target, self.tile_map.points_loaded)
+
+        # Gather the sparks of every hit, in the order of projectiles
+        positions = []
+        angles = []
+        speeds = []
+        for pos_x, pos_y, direction, player_hit in zip(hits_x.tolist(), hits_y.tolist(), directions.tolist(),
+                                                       player_hits.tolist()):
+            # If projectile hit the solid surface, create sparks bouncing back
+            if not player_hit:
                 for spark_num in range(4):
-                    self.sparks.append(Spark(projectile[0],
-                                             random.random() - 0.5 + (math.pi if projectile[1] > 0 else 0),
-                                             2 + random.random()))
-
-            # If projectile is in the world for around 6 seconds (360 frames), remove it
-            elif projectile[2] > 360:
-                self.projectiles.remove(projectile)
-
-            # If player isn't dashing, handle collision with projectile
-            elif abs(self.player.dashing) < 50:
-                # If player is hit, handle it
-                if self.player.rect().collidepoint(projectile[0]):
-                    # Remove the projectile
-                    self.projectiles.remove(projectile)
-                    # Increase death count
-                    self.death += 1
-                    # Play the death sound effect
-                    self.sound_effects["hit"].play()
-                    # Increase screen shake
-                    self.camera.screen_shake = max(16, self.camera.screen_shake)
-
-                    # Create sparks and particles in-place of player
-                    for particle_num in range(25):
-                        angle = random.random() * math.pi * 2
-                        # Create spark with calculate angle and a random speed
-                        self.sparks.append(Spark(self.player.rect().center, angle, 2 + random.random()))
-
-                        # Calculate particle variables
-                        speed = random.random() * 5
-                        velocity = [math.cos(angle + math.pi) * speed * 0.5,
-                                    math.sin(angle + math.pi) * speed * 0.5]
-                        # Create particles with random speed and calculated velocity
-                        self.particles.append(Particle(self, "normal", self.player.rect().center,
-                                                       velocity, random.randint(0, 7)))
+                    positions.append((pos_x, pos_y))
+                    angles.append(random.random() - 0.5 + (math.pi if direction > 0 else 0))
+                    speeds.append(2 + random.random())
+                continue
+
+            # Player is hit, increase death count
+            self.death += 1
+            # Play the death sound effect
+            self.audio.play("hit")
+            # Increase screen shake
+            self.camera.screen_shake = max(16, self.camera.screen_shake)
+
+            # Create sparks and particles in-place of player
+            velocities = []
+            frames = []
+            for particle_num in range(25):
+                angle = random.random() * math.pi * 2
+                # Save spark with calculate angle and a random speed
+                positions.append(self.player.rect().center)
+                angles.append(angle)
+                speeds.append(2 + random.random())
+
+                # Calculate particle variables
+                speed = random.random() * 5
+                velocity = [math.cos(angle + math.pi) * speed * 0.5,
+                            math.sin(angle + math.pi) * speed * 0.5]
+                velocities.append(velocity)
+                frames.append(random.randint(0, 7))
+            # Create particles with random speed and calculated velocity
+            self.particles.spawn_many("normal", [self.player.rect().center] * 25, velocities, frames)
+
+        # Create all the sparks at once
+        if positions:
+            self.sparks.spawn_many(positions, angles, speeds)
+
+    def _draw_projectiles(self, scroll, alpha=1):
+        """Draw the projectiles"""
+        self.projectiles.draw(self.display, scroll, self.outline, alpha)
 
     def _spawn_leafs(self):
         """Spawn leafs at random frames, positions and intervals"""
         for leaf in self.leaf_spawners:
             if random.random() * 49999 < leaf.width * leaf.height:
                 pos = (leaf.x + random.random() * leaf.width, leaf.y + random.random() * leaf.height)
-                self.particles.append(Particle(self, "leaf", pos,
-                                               [-0.1, 0.3], random.randint(0, 20)))
+                self.particles.spawn("leaf", pos, (-0.1, 0.3), random.randint(0, 20))
 
     def _set_leaf_spawners(self):
         """Set the leaf spawners"""
@@ -373,14 +444,15 @@ class Pytformer:
             self.leaf_spawners.append(leaf_spawner)
 
     def _set_entity_spawners(self):
-        """Set the entity spawners"""
+        """Set the entity spawners, remove them from the map"""
+        # Spawn of the player (the last one counts) and the enemies
+        self.player_spawn = None
+        self.enemy_spawns = []
         for spawner in self.tile_map.extract([("spawners", 0), ("spawners", 1)], False):
             if spawner["variant"] == 0:
-                self.player.pos = spawner["pos"]
-                # Reset the air time on death
-                self.player.air_time = 0
+                self.player_spawn = spawner["pos"]
             else:
-                self.enemies.append(Enemy(self, spawner["pos"], (8, 18)))
+                self.enemy_spawns.append(spawner["pos"])
 
     def _update_player(self):
         if self.death:
@@ -389,22 +461,28 @@ class Pytformer:
             if self.death >= 10:
                 self.transition = min(30, self.transition + 1)
             if self.death > 40:
-                self._load_level(self.level)
+                self._restart_level()
 
         if not self.death:
             self.player.update(self.tile_map, (self.movement[1] - self.movement[0], 0))
 
-    def _draw_enemies(self):
-        """Draw the enemies"""
-        # Go through every enemy alive
-        for enemy in self.enemies.copy():
-            # Update the enemy, return is it killed
-            kill = enemy.update(self.tile_map, (0, 0))
-            # Draw it
-            enemy.draw(self.display, self.camera.scroll)
-            # If it is killed, remove it from the list
-            if kill:
-                self.enemies.remove(enemy)
+    def _update_broadphase(self):
+        """Index the player, enemies and projectiles at their current places"""
+        self.broadphase.clear()
+        self.broadphase.insert(self.player, self.player.rect())
+        for enemy in self.enemies:
+            self.broadphase.insert(enemy, enemy.rect())
+
+        # Projectiles are indexed in bulk by their place in the arrays, which is valid until they are updated
+        width, height = self.assets["bullet"].get_size()
+        count = len(self.projectiles)
+        self.broadphase.insert_many("projectile", self.projectiles.pos_x[:count] - width / 2,
+                                    self.projectiles.pos_y[:count] - height / 2, width, height)
+
+    def _update_enemies(self):
+        """Update the enemies"""
+        # Update every enemy alive, the killed ones are removed
+        self.enemies.update(self.tile_map, (0, 0))
 
     def _update_transition(self):
         """Update the level transition"""
@@ -414,8 +492,7 @@ class Pytformer:
             # If transition is past 30, load new level
             if self.transition > 30:
                 # Limit the levels to the amount that exists
-                self.level = min(self.level + 1, len(os.listdir(os.path.join(self.utilities.BASE_PATH,
-                                                                             "../dependencies/data"))) - 1)
+                self.level = min(self.level + 1, len(self.levels) - 1)
                 self._load_level(self.level)
         # If transition is less than 0 (at the beginning), then increase it to show more of the map
         if self.transition < 0:
@@ -423,21 +500,32 @@ class Pytformer:
 
     def _draw_transition(self):
         """Draw the level transition"""
-        # If transition is needed, draw one
-        if self.transition:
-            # Create special surface for it
-            transition_surface = pygame.Surface(self.display.get_size())
-            # Draw a circle based off transition value (times 8, because of surface size)
-            pygame.draw.circle(transition_surface, (255, 255, 255), (self.display.get_width() // 2,
-                               self.display.get_height() // 2), (30 - abs(self.transition)) * 8)
-            # Change color key (invisibility)
-            transition_surface.set_colorkey((255, 255, 255))
-            # Finally, draw the transition
-            self.display.blit(transition_surface, (0, 0))
+        # Draw the pre-rendered frame, if transition is needed
+        self.transition_frames.draw(self.display, self.transition)
 
 
 # Only run the game with this file
 if __name__ == "__main__":
-    # Create the game instance and run it
-    game = Pytformer()
-    game.run()
+    # Parse the command line options
+    parser = argparse.ArgumentParser(description="Pytformer - a Python platformer")
+    parser.add_argument("--headless", action="store_true",
+                        help="run the simulation without a window and sounds")
+    parser.add_argument("--frames", type=int, default=3600, help="number of frames to simulate in headless mode")
+    parser.add_argument("--seed", type=int, help="seed of the random generator")
+    parser.add_argument("--fps", type=int, default=0, help="limit of drawn frames per second (0 is uncapped)")
+    args = parser.parse_args()
+
+    # Make the run repeatable if needed
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    # Create the game instance
+    game = Pytformer(args.headless)
+    # Simulate given number of frames and report the throughput
+    if args.headless:
+        elapsed = game.simulate(args.frames)
+        print(f"Simulated {args.frames} frames in {elapsed:.3f} s ({args.frames / elapsed:.1f} frames/s), "
+              f"level {game.level}, {len(game.enemies)} enemies left")
+    # Run it normally
+    else:
+        game.run(args.fps)
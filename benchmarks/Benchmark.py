@@ -0,0 +1,115 @@
+import time
+import json
+import platform
+
+import pygame
+
+
+class Benchmark:
+    """Single benchmark of a function"""
+    def __init__(self, name, setup, batch=1):
+        """Initialize the benchmark"""
+        # Unique name of the benchmark
+        self.name = name
+        # Function preparing the state, it returns the function to measure
+        self.setup = setup
+        # Number of operations done by one call of the measured function
+        self.batch = batch
+
+    def run(self, min_time=0.5, max_samples=2000, warmup=3):
+        """Run the benchmark, return its statistics"""
+        function = self.setup()
+        # Warm up the caches
+        for sample in range(warmup):
+            function()
+
+        # Measure every call until there is enough time or samples
+        samples = []
+        start = time.perf_counter()
+        while len(samples) < max_samples and (time.perf_counter() - start < min_time or len(samples) < 5):
+            call_start = time.perf_counter()
+            function()
+            samples.append((time.perf_counter() - call_start) / self.batch)
+        return self._statistics(samples)
+
+    def _statistics(self, samples):
+        """Return statistics of the samples (time of one operation)"""
+        ordered = sorted(samples)
+        mean = sum(samples) / len(samples)
+        return {
+            "ops_per_sec": 1 / mean if mean else float("inf"),
+            "mean": mean,
+            "p50": self._percentile(ordered, 50),
+            "p90": self._percentile(ordered, 90),
+            "p99": self._percentile(ordered, 99),
+            "min": ordered[0],
+            "max": ordered[-1],
+            "samples": len(samples),
+            "batch": self.batch
+        }
+
+    @staticmethod
+    def _percentile(ordered, percent):
+        """Return percentile of sorted samples (linear interpolation)"""
+        position = (len(ordered) - 1) * percent / 100
+        lower = int(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def run_all(benchmarks, name_filter=None, min_time=0.5, max_samples=2000):
+    """Run the benchmarks, return results in the JSON format"""
+    results = {}
+    for benchmark in benchmarks:
+        # Skip the benchmarks not matching the filter
+        if name_filter and name_filter not in benchmark.name:
+            continue
+        results[benchmark.name] = benchmark.run(min_time, max_samples)
+        print(f"{benchmark.name:<55} {results[benchmark.name]['ops_per_sec']:>14.1f} ops/s"
+              f"   p50 {results[benchmark.name]['p50'] * 1e6:>10.2f} us"
+              f"   p99 {results[benchmark.name]['p99'] * 1e6:>10.2f} us")
+
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "machine": platform.machine(),
+            "system": platform.system()
+        },
+        "results": results
+    }
+
+
+def save(results, path):
+    """Save the results to a JSON file"""
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2)
+
+
+def load(path):
+    """Load results from a JSON file"""
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def compare(results, baseline, threshold=0.1):
+    """Print changes against loaded baseline results, return names of regressed benchmarks"""
+    baseline = baseline["results"]
+
+    regressions = []
+    print(f"\n{'benchmark':<55} {'baseline':>14} {'current':>14} {'change':>9}")
+    for name, result in results["results"].items():
+        # New benchmarks have nothing to compare with
+        if name not in baseline:
+            print(f"{name:<55} {'-':>14} {result['ops_per_sec']:>14.1f} {'new':>9}")
+            continue
+        change = result["ops_per_sec"] / baseline[name]["ops_per_sec"] - 1
+        # Mark benchmarks that got slower by more than the threshold
+        mark = ""
+        if change < -threshold:
+            regressions.append(name)
+            mark = "  REGRESSION"
+        print(f"{name:<55} {baseline[name]['ops_per_sec']:>14.1f} {result['ops_per_sec']:>14.1f} "
+              f"{change:>+9.1%}{mark}")
+    return regressions
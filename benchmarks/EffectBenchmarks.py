@@ -0,0 +1,156 @@
+import random
+
+import pygame
+
+from benchmarks.Benchmark import Benchmark
+from benchmarks import Fixtures
+from src.ParticleSystem import ParticleSystem
+from src.SparkSystem import SparkSystem
+from src.ProjectileSystem import ProjectileSystem
+
+
+# Numbers of particles, sparks and projectiles
+COUNTS = (1000, 10000, 50000)
+
+
+def _particles(count, seed=0):
+    """Return particle system with given number of particles spread over the screen"""
+    particles = ParticleSystem(Fixtures.game().assets["particles"], {"leaf": (0.03, 0.3)})
+    _spawn_particles(particles, count, random.Random(seed))
+    return particles
+
+
+def _spawn_particles(particles, count, generator):
+    """Spawn given number of random particles"""
+    for particle in range(count):
+        particles.spawn(generator.choice(("normal", "leaf")),
+                        (generator.uniform(0, 320), generator.uniform(0, 240)),
+                        (generator.uniform(-1, 1), generator.uniform(-1, 1)), generator.randint(0, 20))
+
+
+def _sparks(count, seed=0):
+    """Return spark system with given number of sparks spread over the screen"""
+    sparks = SparkSystem()
+    _spawn_sparks(sparks, count, random.Random(seed))
+    return sparks
+
+
+def _spawn_sparks(sparks, count, generator):
+    """Spawn given number of random sparks"""
+    sparks.spawn_many([(generator.uniform(0, 320), generator.uniform(0, 240)) for spark in range(count)],
+                      [generator.uniform(0, 6.28) for spark in range(count)],
+                      [2 + generator.random() for spark in range(count)])
+
+
+def _spawn_projectiles(projectiles, count, generator, bounds):
+    """Spawn given number of random projectiles inside the bounds"""
+    left, top, right, bottom = bounds
+    for projectile in range(count):
+        projectiles.spawn((generator.uniform(left, right), generator.uniform(top, bottom)),
+                          generator.choice((-1.5, 1.5)))
+
+
+def bench_particle_update(count):
+    """Update every particle, replace the finished ones"""
+    def setup():
+        particles = _particles(count)
+        generator = random.Random(1)
+
+        def run():
+            particles.update()
+            _spawn_particles(particles, count - len(particles), generator)
+        return run
+    return setup
+
+
+def bench_particle_draw(count):
+    """Draw every particle"""
+    def setup():
+        particles = _particles(count)
+        surface = pygame.Surface((320, 240), pygame.SRCALPHA)
+
+        def run():
+            particles.draw(surface)
+        return run
+    return setup
+
+
+def bench_spark_update(count):
+    """Update every spark, replace the stopped ones"""
+    def setup():
+        sparks = _sparks(count)
+        generator = random.Random(1)
+
+        def run():
+            sparks.update()
+            _spawn_sparks(sparks, count - len(sparks), generator)
+        return run
+    return setup
+
+
+def bench_spark_draw(count):
+    """Draw every spark"""
+    def setup():
+        sparks = _sparks(count)
+        surface = pygame.Surface((320, 240), pygame.SRCALPHA)
+
+        def run():
+            sparks.draw(surface)
+        return run
+    return setup
+
+
+def bench_projectile_update(count):
+    """Move and hit test every projectile against the first level and the player, replace the removed ones"""
+    def setup():
+        game = Fixtures.game()
+        bounds = Fixtures.level_bounds(game.tile_map)
+        generator = random.Random(0)
+        projectiles = ProjectileSystem(game.assets["bullet"])
+        _spawn_projectiles(projectiles, count, generator, bounds)
+
+        def run():
+            projectiles.update(game.tile_map.solidity, game.tile_map.size, game.player.rect())
+            _spawn_projectiles(projectiles, count - len(projectiles), generator, bounds)
+        return run
+    return setup
+
+
+def bench_clouds_draw():
+    """Draw the clouds of the game"""
+    def setup():
+        game = Fixtures.game()
+        surface = pygame.Surface((320, 240))
+
+        def run():
+            game.clouds.draw(surface)
+        return run
+    return setup
+
+
+def bench_outline():
+    """Gather the silhouette of the first level and draw its outline with the game"""
+    def setup():
+        game = Fixtures.game()
+        game.display.fill((0, 0, 0, 0))
+        game.tile_map.draw(game.display, game.camera.scroll)
+
+        def run():
+            game.outline.begin(game.tile_map, game.display, game.camera.scroll)
+            game._draw_outline()
+        return run
+    return setup
+
+
+def benchmarks():
+    """Return all effect and rendering benchmarks"""
+    found = []
+    for count in COUNTS:
+        found.append(Benchmark("particles.update[" + str(count) + "]", bench_particle_update(count)))
+        found.append(Benchmark("particles.draw[" + str(count) + "]", bench_particle_draw(count)))
+        found.append(Benchmark("sparks.update[" + str(count) + "]", bench_spark_update(count)))
+        found.append(Benchmark("sparks.draw[" + str(count) + "]", bench_spark_draw(count)))
+        found.append(Benchmark("projectiles.update[" + str(count) + "]", bench_projectile_update(count)))
+    found.append(Benchmark("clouds.draw", bench_clouds_draw()))
+    found.append(Benchmark("render.outline", bench_outline()))
+    return found
@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import random
+import tempfile
+
+# Make the game modules importable when running from anywhere
+ROOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+if ROOT_PATH not in sys.path:
+    sys.path.insert(0, ROOT_PATH)
+
+from Pytformer import Pytformer
+from src.LevelFile import LevelFile
+
+
+# Levels shipped with the game
+LEVELS = (0, 1, 2)
+# Synthetic level sizes, as multiplies of the shipped ones
+SCALES = (1, 10, 100)
+
+# Headless game instance shared by all benchmarks
+_game = None
+# Directory of the generated levels
+_level_dir = None
+
+
+def game():
+    """Return the headless game instance"""
+    global _game
+    if not _game:
+        # Same random values on every run
+        random.seed(0)
+        _game = Pytformer(headless=True)
+    return _game
+
+
+def level_path(level, scale=1):
+    """Return path to the level, repeated horizontally scale times"""
+    global _level_dir
+    path = os.path.join(ROOT_PATH, "dependencies/data/level" + str(level) + ".json")
+    if scale == 1:
+        return path
+
+    # Generate the bigger level once
+    if not _level_dir:
+        _level_dir = tempfile.mkdtemp(prefix="pytformer_bench_")
+    scaled_path = os.path.join(_level_dir, "level" + str(level) + "x" + str(scale) + ".json")
+    if not os.path.exists(scaled_path):
+        with open(path, "r") as file:
+            data = json.load(file)
+        with open(scaled_path, "w") as file:
+            json.dump(scale_level(data, scale), file)
+    return scaled_path
+
+
+def binary_level_path(level, scale=1):
+    """Return path to the level converted into the binary format"""
+    global _level_dir
+    if not _level_dir:
+        _level_dir = tempfile.mkdtemp(prefix="pytformer_bench_")
+    binary_path = os.path.join(_level_dir, "level" + str(level) + "x" + str(scale) + ".level")
+    # Convert the level once
+    if not os.path.exists(binary_path):
+        with open(level_path(level, scale), "r") as file:
+            LevelFile.write(binary_path, json.load(file))
+    return binary_path
+
+
+def scale_level(data, scale):
+    """Return level data repeated horizontally scale times"""
+    # Width of the level in tiles, with a gap between the copies
+    positions = [tile["pos"][0] for tile in data["tile_map"].values()]
+    width = max(positions) - min(positions) + 4
+
+    tile_map = {}
+    off_grid = []
+    for copy in range(scale):
+        # Move every grid tile by the width of previous copies
+        for tile in data["tile_map"].values():
+            pos = [tile["pos"][0] + copy * width, tile["pos"][1]]
+            tile_map[str(pos[0]) + ';' + str(pos[1])] = {"type": tile["type"], "variant": tile["variant"],
+                                                         "pos": pos}
+        # Move every off-grid tile too
+        for tile in data["off_grid"]:
+            off_grid.append({"type": tile["type"], "variant": tile["variant"],
+                             "pos": [tile["pos"][0] + copy * width * data["tile_size"], tile["pos"][1]]})
+    return {"tile_map": tile_map, "tile_size": data["tile_size"], "off_grid": off_grid}
+
+
+def level_bounds(tile_map):
+    """Return bounds of the grid tiles in pixels (left, top, right, bottom)"""
+    positions = [(pos_x, pos_y) for pos_x, pos_y, tile_type, variant in tile_map.grid.tiles()]
+    return (min(pos[0] for pos in positions) * tile_map.size, min(pos[1] for pos in positions) * tile_map.size,
+            (max(pos[0] for pos in positions) + 1) * tile_map.size,
+            (max(pos[1] for pos in positions) + 1) * tile_map.size)
+
+
+def random_positions(bounds, count, seed=0):
+    """Return list of random positions inside the bounds"""
+    generator = random.Random(seed)
+    return [(generator.uniform(bounds[0], bounds[2]), generator.uniform(bounds[1], bounds[3]))
+            for position in range(count)]
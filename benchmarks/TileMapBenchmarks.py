@@ -0,0 +1,130 @@
+import pygame
+
+from benchmarks.Benchmark import Benchmark
+from benchmarks import Fixtures
+from src.TileMap import TileMap
+
+
+# Number of queries done in one measured call
+QUERIES = 1000
+
+
+def _tile_map(level, scale):
+    """Return tile map with the loaded level (without entity spawners, like in the game)"""
+    tile_map = TileMap(Fixtures.game())
+    tile_map.load(Fixtures.level_path(level, scale))
+    tile_map.extract([("spawners", 0), ("spawners", 1)])
+    return tile_map
+
+
+def bench_draw(level, scale):
+    """Draw the map with camera moving through the whole level"""
+    def setup():
+        tile_map = _tile_map(level, scale)
+        surface = pygame.Surface((320, 240), pygame.SRCALPHA)
+        bounds = Fixtures.level_bounds(tile_map)
+        # Camera moves by 2 pixels each frame through the level and back
+        offsets = [(pos_x, bounds[1] + (bounds[3] - bounds[1]) / 2 - 120)
+                   for pos_x in range(bounds[0] - 160, bounds[2] - 160, 2)]
+        state = {"frame": 0}
+
+        def run():
+            surface.fill((0, 0, 0, 0))
+            tile_map.draw(surface, offsets[state["frame"] % len(offsets)])
+            state["frame"] += 1
+        return run
+    return setup
+
+
+def bench_solid_tiles_in(level, scale):
+    """Get physics tiles in the areas swept by player-sized entities at random positions"""
+    def setup():
+        tile_map = _tile_map(level, scale)
+        # Player is 8x15 pixels and moves up to a few pixels a frame
+        areas = [(int(pos_x) - 4, int(pos_y) - 4, int(pos_x) + 12, int(pos_y) + 19)
+                 for pos_x, pos_y in Fixtures.random_positions(Fixtures.level_bounds(tile_map), QUERIES)]
+
+        def run():
+            for left, top, right, bottom in areas:
+                tile_map.solid_tiles_in(left, top, right, bottom)
+        return run
+    return setup
+
+
+def bench_solid_check(level, scale):
+    """Check solidity of random positions"""
+    def setup():
+        tile_map = _tile_map(level, scale)
+        positions = Fixtures.random_positions(Fixtures.level_bounds(tile_map), QUERIES)
+
+        def run():
+            for pos in positions:
+                tile_map.solid_check(pos)
+        return run
+    return setup
+
+
+def bench_auto_tile(level, scale):
+    """Auto-tile the whole map"""
+    def setup():
+        tile_map = _tile_map(level, scale)
+        return tile_map.auto_tile
+    return setup
+
+
+def bench_auto_tile_edit(level, scale):
+    """Place and remove tiles at random positions with live auto-tiling"""
+    def setup():
+        tile_map = _tile_map(level, scale)
+        tile_map.auto_tiling = True
+        positions = [(int(pos[0] // tile_map.size), int(pos[1] // tile_map.size))
+                     for pos in Fixtures.random_positions(Fixtures.level_bounds(tile_map), QUERIES)]
+
+        def run():
+            # Every placed tile is removed again, so the next call edits the same cells
+            for pos in positions:
+                if not tile_map.grid.get(*pos):
+                    tile_map.place_tile(pos, "grass", 0)
+                    tile_map.remove_tile(pos)
+        return run
+    return setup
+
+
+def bench_extract(level, scale):
+    """Extract the trees without removing them"""
+    def setup():
+        tile_map = _tile_map(level, scale)
+
+        def run():
+            tile_map.extract([("big_decorations", 1)], True)
+        return run
+    return setup
+
+
+def bench_load(level, scale, binary=False):
+    """Load the level from the file, the JSON or binary one"""
+    def setup():
+        tile_map = TileMap(Fixtures.game())
+        path = Fixtures.binary_level_path(level, scale) if binary else Fixtures.level_path(level, scale)
+
+        def run():
+            tile_map.load(path)
+        return run
+    return setup
+
+
+def benchmarks():
+    """Return all tile map benchmarks"""
+    found = []
+    for level in Fixtures.LEVELS:
+        for scale in Fixtures.SCALES:
+            suffix = "[level" + str(level) + ",x" + str(scale) + "]"
+            found.append(Benchmark("tilemap.draw" + suffix, bench_draw(level, scale)))
+            found.append(Benchmark("tilemap.solid_tiles_in" + suffix, bench_solid_tiles_in(level, scale), QUERIES))
+            found.append(Benchmark("tilemap.solid_check" + suffix, bench_solid_check(level, scale), QUERIES))
+            found.append(Benchmark("tilemap.auto_tile" + suffix, bench_auto_tile(level, scale)))
+            found.append(Benchmark("tilemap.auto_tile_edit" + suffix, bench_auto_tile_edit(level, scale), QUERIES))
+            found.append(Benchmark("tilemap.extract" + suffix, bench_extract(level, scale)))
+            found.append(Benchmark("tilemap.load" + suffix, bench_load(level, scale)))
+            found.append(Benchmark("tilemap.load_binary" + suffix, bench_load(level, scale, True)))
+    return found
@@ -0,0 +1 @@
+"""Micro-benchmarks of the engine hot paths, run them with: python -m benchmarks"""
@@ -0,0 +1,40 @@
+import sys
+import argparse
+
+from benchmarks import Benchmark
+from benchmarks import TileMapBenchmarks
+from benchmarks import EffectBenchmarks
+
+
+def main():
+    """Run the benchmarks, save them and compare with a baseline"""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Pytformer micro-benchmarks")
+    parser.add_argument("--output", default="benchmark_results.json", help="file to save the results to")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="slowdown treated as a regression (0.1 is 10%%)")
+    parser.add_argument("--filter", help="run only benchmarks with names containing this text")
+    parser.add_argument("--min-time", type=float, default=0.5, help="minimal time of every benchmark (seconds)")
+    parser.add_argument("--max-samples", type=int, default=2000, help="maximal samples of every benchmark")
+    args = parser.parse_args()
+
+    # Read the baseline first, it may be the file the results are saved to
+    baseline = Benchmark.load(args.compare) if args.compare else None
+
+    # Gather and run every benchmark
+    benchmarks = TileMapBenchmarks.benchmarks() + EffectBenchmarks.benchmarks()
+    results = Benchmark.run_all(benchmarks, args.filter, args.min_time, args.max_samples)
+    Benchmark.save(results, args.output)
+    print(f"\nResults saved to {args.output}")
+
+    # Compare with the baseline, fail on regressions
+    if baseline:
+        regressions = Benchmark.compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmarks regressed by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,37 +1,29 @@
+import pygame
+
+
 class Animation:
-    """Class to manage animations"""
+    """Animation clip, shared by everything playing it and not changed after the assets are loaded"""
+    __slots__ = ("images", "duration", "loop", "length", "frame_images", "variants")
+
     def __init__(self, images, duration=8, loop=True):
         """Initialize the animation"""
         self.images = images
         self.duration = duration
         self.loop = loop
+        # Number of frames of the whole animation
+        self.length = duration * len(images)
+        # Index of the image shown on every frame
+        self.frame_images = tuple(frame // duration for frame in range(self.length))
 
-        self.end = False
-        self.frame = 0
-
-    def update(self):
-        """Update the frames of animation"""
-        # Loop the animation if needed
-        if self.loop:
-            self.frame = (self.frame + 1) % (self.duration * len(self.images))
-
-        # Move to the next frame without looping
-        else:
-            next_frame = self.frame + 1
-            end_frame = self.duration * len(self.images) - 1
-            # Make sure that the next frame is valid
-            if next_frame <= end_frame:
-                self.frame = next_frame
-            else:
-                self.frame = end_frame
-            # If this was the last frame, end the animation
-            if self.frame >= self.duration * len(self.images) - 1:
-                self.end = True
+        # Precomputed variants of the frames by name (mirrored ones are always there)
+        self.variants = {}
+        self.add_variant("flipped", lambda image: pygame.transform.flip(image, True, False))
 
-    def get_frame_image(self):
-        """Get the current frame image"""
-        return self.images[int(self.frame / self.duration)]
+    def add_variant(self, name, transform):
+        """Precompute variant of the frames (like tinted hit-flash ones) by transforming every image"""
+        self.variants[name] = [transform(image) for image in self.images]
 
-    def copy_animation(self):
-        """Get copy of this animation"""
-        return Animation(self.images, self.duration, self.loop)
+    def get_image(self, frame, variant=None):
+        """Get image of the frame, or its variant"""
+        images = self.variants[variant] if variant else self.images
+        return images[self.frame_images[frame]]
@@ -0,0 +1,74 @@
+import numpy as np
+
+
+class ArrayStore:
+    """Base of systems storing their objects in NumPy arrays, one array per field"""
+    # Names and types of the arrays, set by subclasses
+    FIELDS = ()
+    # Names of the fields that also keep their values from the previous step, to draw between steps
+    INTERPOLATED = ()
+
+    def __init__(self, capacity=256):
+        """Initialize empty arrays"""
+        # Every array, with the previous values of the interpolated fields
+        self.arrays = self.FIELDS + tuple(("previous_" + name, dtype) for name, dtype in self.FIELDS
+                                          if name in self.INTERPOLATED)
+        # Number of active objects, they are always at the front of the arrays
+        self.count = 0
+        self.capacity = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        """Allocate arrays with given capacity, keep the active objects"""
+        for name, dtype in self.arrays:
+            array = np.zeros(capacity, dtype)
+            # Copy the active objects from the old array
+            if self.count:
+                array[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def _reserve(self, amount):
+        """Make space for new objects, return slice of their place in the arrays"""
+        if self.count + amount > self.capacity:
+            capacity = self.capacity
+            while self.count + amount > capacity:
+                capacity *= 2
+            self._allocate(capacity)
+
+        new = slice(self.count, self.count + amount)
+        self.count += amount
+        return new
+
+    def _spawned(self, new):
+        """Start the new objects without movement from the previous step"""
+        for name in self.INTERPOLATED:
+            getattr(self, "previous_" + name)[new] = getattr(self, name)[new]
+
+    def _save_previous(self):
+        """Keep values of the interpolated fields before the step changes them"""
+        for name in self.INTERPOLATED:
+            getattr(self, "previous_" + name)[:self.count] = getattr(self, name)[:self.count]
+
+    def _interpolate(self, name, alpha=1):
+        """Return values of the field between the previous step (alpha 0) and the last one (alpha 1)"""
+        current = getattr(self, name)[:self.count]
+        if alpha >= 1:
+            return current
+        return current - (current - getattr(self, "previous_" + name)[:self.count]) * (1 - alpha)
+
+    def _compact(self, keep):
+        """Keep only the objects marked in the mask, move them to the front in one go"""
+        remaining = int(keep.sum())
+        for name, dtype in self.arrays:
+            array = getattr(self, name)
+            array[:remaining] = array[:self.count][keep]
+        self.count = remaining
+
+    def __len__(self):
+        """Return number of active objects"""
+        return self.count
+
+    def clear(self):
+        """Remove all objects"""
+        self.count = 0
@@ -0,0 +1,106 @@
+import os
+
+import pygame
+
+
+class AudioManager:
+    """Audio of the game - streamed music and sound effects played on a fixed pool of channels"""
+    # Sound effects: file, volume, priority (higher wins a channel) and maximum number of simultaneous plays
+    SOUNDS = {
+        "jump": ("jump.flac", 0.8, 2, 1),
+        "dash": ("dash.wav", 0.9, 3, 1),
+        "hit": ("hit.mp3", 0.9, 4, 2),
+        "shoot": ("shoot.mp3", 0.5, 1, 2),
+        "ambience": ("ambience.mp3", 0.2, 0, 1)
+    }
+    # Music tracks
+    MUSIC = {
+        "basic": ("music/basic.wav", 1)
+    }
+
+    def __init__(self, base_path, enabled=True, channels=8):
+        """Initialize the audio manager, disabled one doesn't load or play anything"""
+        # Directory with the sounds
+        self.sound_path = os.path.join(base_path, "../dependencies/sounds/")
+        # Play the audio only if it is enabled and mixer works
+        self.enabled = enabled and pygame.mixer.get_init() is not None
+
+        # Loaded sound effects
+        self.sounds = {}
+        # Pool of channels and name of the sound last played on each of them
+        self.channels = []
+        self.playing = []
+        # Currently streamed music track
+        self.music = None
+        # Event sent when the music track ends
+        self.MUSIC_END = pygame.event.custom_type()
+
+        if self.enabled:
+            self._load_sounds()
+            # Own every channel of the mixer
+            pygame.mixer.set_num_channels(channels)
+            self.channels = [pygame.mixer.Channel(channel) for channel in range(channels)]
+            self.playing = [None] * channels
+            # Get notified when the music ends, so it can be looped
+            pygame.mixer.music.set_endevent(self.MUSIC_END)
+
+    def _load_sounds(self):
+        """Load the sound effects and adjust their volumes"""
+        for name, (file, volume, priority, limit) in self.SOUNDS.items():
+            self.sounds[name] = pygame.mixer.Sound(os.path.join(self.sound_path, file))
+            self.sounds[name].set_volume(volume)
+
+    def play(self, name):
+        """Play the sound effect on a channel from the pool, return whether it is played"""
+        if not self.enabled:
+            return False
+        priority, limit = self.SOUNDS[name][2:]
+
+        # Find a free channel, a channel to take from a less important sound and count plays of this sound
+        free = None
+        weakest = None
+        weakest_priority = priority
+        plays = 0
+        for index, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                free = index if free is None else free
+                continue
+            playing = self.playing[index]
+            if playing == name:
+                plays += 1
+            elif self.SOUNDS[playing][2] < weakest_priority:
+                weakest = index
+                weakest_priority = self.SOUNDS[playing][2]
+
+        # Don't let the sound play too many times at once
+        if plays >= limit:
+            return False
+        # Use a free channel, or take one from a less important sound
+        index = free if free is not None else weakest
+        if index is None:
+            return False
+        self.channels[index].play(self.sounds[name])
+        self.playing[index] = name
+        return True
+
+    def play_music(self, name):
+        """Start streaming the music track, keep it playing if it is already the current one"""
+        if not self.enabled or self.music == name:
+            return
+        file, volume = self.MUSIC[name]
+        # Load the track once, it is streamed from the disk while playing
+        pygame.mixer.music.load(os.path.join(self.sound_path, file))
+        pygame.mixer.music.set_volume(volume)
+        pygame.mixer.music.play()
+        self.music = name
+
+    def stop_music(self):
+        """Stop the music"""
+        if self.enabled and self.music:
+            self.music = None
+            pygame.mixer.music.stop()
+
+    def handle_event(self, event):
+        """Handle the audio events, loop the music when it ends"""
+        if event.type == self.MUSIC_END and self.music:
+            pygame.mixer.music.play()
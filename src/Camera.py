@@ -12,6 +12,8 @@ class Camera:
 
         # Camera movement scroll
         self.scroll = [0, 0]
+        # Scroll before the last step, to draw between steps
+        self.previous_scroll = [0, 0]
 
         # Screen shake
         self.screen_shake = 0
@@ -21,6 +23,7 @@ class Camera:
 
     def update_scroll(self, surface):
         """Center camera around the player"""
+        self.previous_scroll[:] = self.scroll
         # Center horizontally
         self.scroll[0] += ((self.player.rect().centerx - surface.get_width() / 2
                             - self.scroll[0]) / 30)
@@ -34,6 +37,11 @@ class Camera:
         self.screen_shake_offset = (random.random() * self.screen_shake - self.screen_shake / 2,
                                     random.random() * self.screen_shake - self.screen_shake / 2)
 
+    def render_scroll(self, alpha=1):
+        """Return scroll between the previous step (alpha 0) and the last one (alpha 1)"""
+        return (self.scroll[0] - (self.scroll[0] - self.previous_scroll[0]) * (1 - alpha),
+                self.scroll[1] - (self.scroll[1] - self.previous_scroll[1]) * (1 - alpha))
+
     def update_scroll_editor(self, movement):
         """Center the camera in the editor"""
         # Move horizontally
@@ -0,0 +1,129 @@
+import math
+from collections import OrderedDict
+
+import pygame
+
+
+class ChunkCache:
+    """Cache of pre-rendered chunks of the tile map"""
+    def __init__(self, tile_map, chunk_size=16, capacity=64):
+        """Initialize the chunk cache"""
+        # Tile map reference
+        self.tile_map = tile_map
+        # Chunk size in tiles
+        self.chunk_size = chunk_size
+        # Maximum amount of chunks kept in memory
+        self.capacity = capacity
+
+        # Rendered chunks, the least recently used ones are first
+        self.chunks = OrderedDict()
+        # Silhouettes of the rendered chunks, created when they are needed
+        self.masks = {}
+        # Increased every time a chunk changes, so things made from chunks know when to refresh
+        self.version = 0
+
+    def pixel_size(self):
+        """Return chunk size in pixels"""
+        return self.chunk_size * self.tile_map.size
+
+    def visible(self, view_size, offset=(0, 0)):
+        """Yield keys and view positions of the chunks visible in the view"""
+        # Round the offset once, so chunks line up without seams
+        offset = (math.floor(offset[0]), math.floor(offset[1]))
+        size = self.pixel_size()
+
+        # Calculate the range of visible chunks
+        range_x = (offset[0] // size, (offset[0] + view_size[0]) // size + 1)
+        range_y = (offset[1] // size, (offset[1] + view_size[1]) // size + 1)
+
+        for chunk_y in range(range_y[0], range_y[1]):
+            for chunk_x in range(range_x[0], range_x[1]):
+                yield (chunk_x, chunk_y), (chunk_x * size - offset[0], chunk_y * size - offset[1])
+
+    def draw(self, surface, offset=(0, 0)):
+        """Draw the visible chunks"""
+        # Draw every visible chunk that isn't empty
+        for key, pos in self.visible(surface.get_size(), offset):
+            chunk = self.get_chunk(key)
+            if chunk:
+                surface.blit(chunk, pos)
+
+    def draw_mask(self, mask, offset=(0, 0)):
+        """Add silhouettes of the visible chunks to the mask"""
+        for key, pos in self.visible(mask.get_size(), offset):
+            chunk_mask = self.get_mask(key)
+            if chunk_mask:
+                mask.draw(chunk_mask, pos)
+
+    def get_chunk(self, key):
+        """Return the rendered chunk, render it if it isn't cached"""
+        # If chunk is cached, mark it as the most recently used one
+        if key in self.chunks:
+            self.chunks.move_to_end(key)
+            return self.chunks[key]
+
+        # Render the chunk and cache it
+        chunk = self._render_chunk(key)
+        self.chunks[key] = chunk
+        # Evict the least recently used chunks if there are too many of them
+        while len(self.chunks) > self.capacity:
+            self.masks.pop(self.chunks.popitem(last=False)[0], None)
+        return chunk
+
+    def get_mask(self, key):
+        """Return silhouette of the chunk, None if it's empty"""
+        chunk = self.get_chunk(key)
+        if chunk and key not in self.masks:
+            self.masks[key] = pygame.mask.from_surface(chunk)
+        return self.masks.get(key)
+
+    def _render_chunk(self, key):
+        """Render both layers of the chunk, return None if it's empty"""
+        size = self.pixel_size()
+        # Position of the chunk in the world (pixels)
+        origin = (key[0] * size, key[1] * size)
+        chunk_rect = (origin[0], origin[1], size, size)
+        surface = None
+
+        # Render tiles not affected by physics (off-grid ones) that overlap the chunk, their positions are floored
+        # so the parts in neighbouring chunks meet without a seam
+        for tile in self.tile_map.query_rect(chunk_rect):
+            surface = surface or pygame.Surface((size, size), pygame.SRCALPHA)
+            surface.blit(self.tile_map.game.assets[tile["type"]][tile["variant"]],
+                         (math.floor(tile["pos"][0]) - origin[0], math.floor(tile["pos"][1]) - origin[1]))
+
+        # Render tiles affected by physics (grid) above them
+        grid = self.tile_map.grid
+        grid_chunk = grid.chunks.get(key)
+        if grid_chunk:
+            surface = surface or pygame.Surface((size, size), pygame.SRCALPHA)
+            for index, type_id in enumerate(grid_chunk.types):
+                # If the tile exists, draw it
+                if type_id:
+                    image = self.tile_map.game.assets[grid.type_names[type_id]][grid_chunk.variants[index]]
+                    surface.blit(image, (index % grid.chunk_size * self.tile_map.size,
+                                         index // grid.chunk_size * self.tile_map.size))
+        return surface
+
+    def invalidate_tile(self, pos):
+        """Invalidate the chunk containing grid position"""
+        self.invalidate_chunk((pos[0] // self.chunk_size, pos[1] // self.chunk_size))
+
+    def invalidate_rect(self, rect):
+        """Invalidate every chunk overlapping rectangle (pixels)"""
+        size = self.pixel_size()
+        for chunk_x in range(math.floor(rect.left / size), math.floor((rect.right - 1) / size) + 1):
+            for chunk_y in range(math.floor(rect.top / size), math.floor((rect.bottom - 1) / size) + 1):
+                self.invalidate_chunk((chunk_x, chunk_y))
+
+    def invalidate_chunk(self, key):
+        """Invalidate the chunk and its silhouette"""
+        self.chunks.pop(key, None)
+        self.masks.pop(key, None)
+        self.version += 1
+
+    def clear(self):
+        """Remove all cached chunks"""
+        self.chunks.clear()
+        self.masks.clear()
+        self.version += 1
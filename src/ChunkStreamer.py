@@ -0,0 +1,55 @@
+import queue
+import threading
+
+
+class ChunkStreamer:
+    """Reads chunks of a region file in a background thread, the main thread picks them up when ready"""
+    def __init__(self, region):
+        """Initialize the streamer and start its thread"""
+        self.region = region
+        # Chunk positions waiting to be read, None stops the thread
+        self.requests = queue.Queue()
+        # Read chunks as (position, (type ids, variants))
+        self.loaded = queue.Queue()
+        # Requested chunks not picked up yet, only used by the main thread
+        self.pending = set()
+        self.thread = threading.Thread(target=self._work, daemon=True)
+        self.thread.start()
+
+    def _work(self):
+        """Read requested chunks until stopped"""
+        while True:
+            key = self.requests.get()
+            if key is None:
+                return
+            # Errors are passed to the main thread, so waiting for the chunk doesn't hang
+            try:
+                self.loaded.put((key, self.region.read_chunk(key)))
+            except Exception as error:
+                self.loaded.put((key, error))
+
+    def request(self, key):
+        """Ask for the chunk to be read, unless it already was"""
+        if key not in self.pending:
+            self.pending.add(key)
+            self.requests.put(key)
+
+    def finished(self, wait=False):
+        """Return chunks read since the last call, wait for every requested one if needed"""
+        chunks = []
+        while self.pending:
+            try:
+                key, data = self.loaded.get(wait)
+            except queue.Empty:
+                break
+            self.pending.discard(key)
+            if isinstance(data, Exception):
+                raise data
+            chunks.append((key, data))
+        return chunks
+
+    def stop(self):
+        """Stop the thread and close the region file"""
+        self.requests.put(None)
+        self.thread.join()
+        self.region.close()
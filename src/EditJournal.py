@@ -0,0 +1,68 @@
+class EditJournal:
+    """Undo and redo history of the editor, every stroke keeps only the cells it changed"""
+    def __init__(self, tile_map, limit=256):
+        """Initialize empty history"""
+        self.tile_map = tile_map
+        # Maximum amount of strokes that can be undone
+        self.limit = limit
+        # Finished strokes, the last one is undone first
+        self.undo_strokes = []
+        # Undone strokes, the last one is redone first
+        self.redo_strokes = []
+        # If a stroke is being logged
+        self.recording = False
+
+    def begin(self):
+        """Start logging edits of a stroke, unless one is logged already"""
+        if self.recording:
+            return
+        self.recording = True
+        self.tile_map.change_log = []
+
+    def end(self):
+        """Finish the stroke and keep it if it changed anything"""
+        if not self.recording:
+            return
+        self.recording = False
+        stroke = self.compact(self.tile_map.change_log)
+        self.tile_map.change_log = None
+        if stroke:
+            self.undo_strokes.append(stroke)
+            del self.undo_strokes[:-self.limit]
+            # New edits replace the undone ones
+            self.redo_strokes.clear()
+
+    @staticmethod
+    def compact(changes):
+        """Return changes merged into one per cell or off-grid tile, from its first state to the last one"""
+        merged = {}
+        for kind, key, previous, current in changes:
+            if (kind, key) in merged:
+                merged[(kind, key)][1] = current
+            else:
+                merged[(kind, key)] = [previous, current]
+        # Cells that ended in the state they started in didn't change
+        return [(kind, key, previous, current) for (kind, key), (previous, current) in merged.items()
+                if previous != current]
+
+    def undo(self):
+        """Undo the last stroke"""
+        self.end()
+        if self.undo_strokes:
+            stroke = self.undo_strokes.pop()
+            self.tile_map.undo(stroke)
+            self.redo_strokes.append(stroke)
+
+    def redo(self):
+        """Redo the last undone stroke"""
+        self.end()
+        if self.redo_strokes:
+            stroke = self.redo_strokes.pop()
+            self.tile_map.redo(stroke)
+            self.undo_strokes.append(stroke)
+
+    def clear(self):
+        """Forget the whole history"""
+        self.end()
+        self.undo_strokes.clear()
+        self.redo_strokes.clear()
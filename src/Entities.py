@@ -3,11 +3,26 @@ import math
 
 import pygame
 
-from src.Particle import Particle
-from src.Spark import Spark
+from src.Playhead import Playhead
+
+
+class Collisions:
+    """Sides of an entity that collided with tiles in the last update"""
+    __slots__ = ("left", "right", "up", "down")
+
+    def __init__(self):
+        """Initialize the collisions"""
+        self.reset()
+
+    def reset(self):
+        """Clear every side"""
+        self.left = self.right = self.up = self.down = False
 
 
 class PhysicsEntity:
+    __slots__ = ("game", "type", "pos", "previous_pos", "velocity", "size", "last_movement", "action", "animation",
+                 "collisions", "animation_offset", "flip_animation", "_rect", "_rect_pos")
+
     def __init__(self, game, entity_type, entity_pos, entity_size):
         """Initialize physics entity"""
         # Get reference to the game
@@ -16,18 +31,24 @@ class PhysicsEntity:
         # Set entity parameters
         self.type = entity_type
         self.pos = list(entity_pos)
+        # Position before the last update, to draw between steps
+        self.previous_pos = list(entity_pos)
         self.velocity = [0, 0]
         self.size = entity_size
 
         # Last entity's movement
         self.last_movement = [0, 0]
 
-        # Entity action
-        self.action = ''
-        self.set_action("idle")
+        # Entity action and position in its animation
+        self.action = "idle"
+        self.animation = Playhead(self.game.assets[self.type + '_animations'][self.action])
 
         # Collision booleans
-        self.collisions = {"Left": False, "Right": False, "Up": False, "Down": False}
+        self.collisions = Collisions()
+
+        # Rectangle of entity and the position it was made for, it is only updated after moving
+        self._rect = pygame.Rect(0, 0, self.size[0], self.size[1])
+        self._rect_pos = None
 
         # Animation variables
         self.animation_offset = (-1, 0)
@@ -35,51 +56,31 @@ class PhysicsEntity:
 
     def update(self, tile_map, movement=(0, 0)):
         """Update position of entity"""
+        self.previous_pos[:] = self.pos
         # Save movement, by increasing it by velocity
         pos_increase = (movement[0] + self.velocity[0], movement[1] + self.velocity[1])
 
         # Reset the collisions
-        self.collisions = {"Left": False, "Right": False, "Up": False, "Down": False}
-
-        # Add movement to the current horizontal position
-        self.pos[0] += pos_increase[0]
-        # Save entity's rectangle
-        rect = self.rect()
-
-        # Go through each of nearby physics tiles
-        for tile_rect in tile_map.physics_tiles_near(self.pos):
-            # If there is a collision, handle it
-            if rect.colliderect(tile_rect):
-                # If player moves to the right, hug him to the wall
-                if pos_increase[0] > 0:
-                    rect.right = tile_rect.left
-                    self.collisions["Right"] = True
-                # If player moves to the left, hug him to the wall
-                if pos_increase[0] < 0:
-                    rect.left = tile_rect.right
-                    self.collisions["Left"] = True
-                # Update the position
-                self.pos[0] = rect.x
-
-        # Add movement to the current vertical position
-        self.pos[1] += pos_increase[1]
-        # Save entity's rectangle
-        rect = self.rect()
-
-        # Go through each of nearby physics tiles
-        for tile_rect in tile_map.physics_tiles_near(self.pos):
-            # If there is a collision handle it again
-            if rect.colliderect(tile_rect):
-                # If player falls on the tile, don't let him through it
-                if pos_increase[1] > 0:
-                    rect.bottom = tile_rect.top
-                    self.collisions["Down"] = True
-                # If player hit the tile, don't allow him to jump through it
-                if pos_increase[1] < 0:
-                    rect.top = tile_rect.bottom
-                    self.collisions["Up"] = True
-                # Update real position
-                self.pos[1] = rect.y
+        self.collisions.reset()
+
+        # Rectangle of entity before moving (positions are truncated like in pygame rectangles)
+        left, top = int(self.pos[0]), int(self.pos[1])
+        # Position after the whole movement if nothing is in the way
+        end = (self.pos[0] + pos_increase[0], self.pos[1] + pos_increase[1])
+
+        # Gather the physics tiles along the whole movement once
+        tiles = tile_map.solid_tiles_in(min(left, int(end[0])), min(top, int(end[1])),
+                                        max(left, int(end[0])) + self.size[0],
+                                        max(top, int(end[1])) + self.size[1])
+
+        # Sweep horizontally, stop at the first tile hit
+        self.pos[0] = end[0]
+        if pos_increase[0] and tiles:
+            self._sweep_x(tiles, tile_map.size, left, top, int(end[0]), pos_increase[0])
+        # Sweep vertically from the new horizontal position
+        self.pos[1] = end[1]
+        if pos_increase[1] and tiles:
+            self._sweep_y(tiles, tile_map.size, int(self.pos[0]), top, int(end[1]), pos_increase[1])
 
         # Set the correct entity animation direction based of movement
         if movement[0] > 0:
@@ -94,31 +95,92 @@ class PhysicsEntity:
         self.velocity[1] = min(5, self.velocity[1] + 0.1)
 
         # Stop accelerating while jumping or falling when there is a collision
-        if self.collisions["Up"] or self.collisions["Down"]:
+        if self.collisions.up or self.collisions.down:
             self.velocity[1] = 0
 
         # Update the animation
         self.animation.update()
 
-    def draw(self, surface, offset=(0, 0)):
-        """Draw the entity"""
-        surface.blit(pygame.transform.flip(
-            self.animation.get_frame_image(), self.flip_animation, False),
-                     (self.pos[0] - offset[0] + self.animation_offset[0],
-                      self.pos[1] - offset[1] + self.animation_offset[1]))
+    def _sweep_x(self, tiles, size, left, top, end_x, increase):
+        """Stop horizontal movement at the first tile in the way"""
+        # Rows covered by the entity
+        first_row, last_row = top // size, (top + self.size[1] - 1) // size
+        if increase > 0:
+            # Columns from the right edge to where it ends up
+            first, last = (left + self.size[0]) // size, (end_x + self.size[0] - 1) // size
+            hits = [column for column, row in tiles if first <= column <= last and first_row <= row <= last_row]
+            # Hug the entity to the closest wall
+            if hits:
+                self.pos[0] = min(hits) * size - self.size[0]
+                self.collisions.right = True
+        else:
+            # Columns from the left edge to where it ends up
+            first, last = end_x // size, (left - 1) // size
+            hits = [column for column, row in tiles if first <= column <= last and first_row <= row <= last_row]
+            if hits:
+                self.pos[0] = (max(hits) + 1) * size
+                self.collisions.left = True
+
+    def _sweep_y(self, tiles, size, left, top, end_y, increase):
+        """Stop vertical movement at the first tile in the way"""
+        # Columns covered by the entity
+        first_column, last_column = left // size, (left + self.size[0] - 1) // size
+        if increase > 0:
+            # Rows from the bottom edge to where it ends up
+            first, last = (top + self.size[1]) // size, (end_y + self.size[1] - 1) // size
+            hits = [row for column, row in tiles if first <= row <= last and first_column <= column <= last_column]
+            # Land on the closest tile
+            if hits:
+                self.pos[1] = min(hits) * size - self.size[1]
+                self.collisions.down = True
+        else:
+            # Rows from the top edge to where it ends up
+            first, last = end_y // size, (top - 1) // size
+            hits = [row for column, row in tiles if first <= row <= last and first_column <= column <= last_column]
+            # Hit the closest ceiling
+            if hits:
+                self.pos[1] = (max(hits) + 1) * size
+                self.collisions.up = True
+
+    def teleport(self, pos):
+        """Move the entity without drawing the movement between steps"""
+        self.pos = list(pos)
+        self.previous_pos = list(pos)
+
+    def render_pos(self, alpha=1):
+        """Return position between the previous update (alpha 0) and the last one (alpha 1)"""
+        return (self.pos[0] - (self.pos[0] - self.previous_pos[0]) * (1 - alpha),
+                self.pos[1] - (self.pos[1] - self.previous_pos[1]) * (1 - alpha))
+
+    def draw(self, surface, offset=(0, 0), outline=None, alpha=1):
+        """Draw the entity alpha of the way from the previous update, add it to the outline silhouette if given"""
+        # Use the pre-flipped frame if the entity is facing left
+        image = self.animation.get_frame_image("flipped" if self.flip_animation else None)
+        render_pos = self.render_pos(alpha)
+        pos = (render_pos[0] - offset[0] + self.animation_offset[0],
+               render_pos[1] - offset[1] + self.animation_offset[1])
+        surface.blit(image, pos)
+        if outline:
+            outline.add(image, pos)
 
     def rect(self):
-        """Return rectangle of entity"""
-        return pygame.Rect(self.pos[0], self.pos[1], self.size[0], self.size[1])
+        """Return rectangle of entity (the same one is reused, don't change it)"""
+        # Move the rectangle only if the entity moved, positions are truncated like in new rectangles
+        if self._rect_pos != self.pos:
+            self._rect_pos = list(self.pos)
+            self._rect.topleft = (int(self.pos[0]), int(self.pos[1]))
+        return self._rect
 
     def set_action(self, action):
         if action != self.action:
             self.action = action
-            self.animation = self.game.assets[self.type + '_animations'][action].copy_animation()
+            self.animation.play(self.game.assets[self.type + '_animations'][action])
 
 
 class Player(PhysicsEntity):
     """The player entity"""
+    __slots__ = ("air_time", "jumps", "dashing", "wall_slide")
+
     def __init__(self, game, pos, size):
         """Initialize the player"""
         super().__init__(game, "player", pos, size)
@@ -145,7 +207,7 @@ class Player(PhysicsEntity):
             self.game.death += 1
 
         # If the player is standing, reset the time in air
-        if self.collisions["Down"]:
+        if self.collisions.down:
             self.air_time = 0
             # Reset the jumps
             self.jumps = 1
@@ -154,13 +216,13 @@ class Player(PhysicsEntity):
         self.wall_slide = False
 
         # If player collides with wall and is in the air, turn on the wall slide
-        if (self.collisions["Left"] or self.collisions["Right"]) and self.air_time > 4:
+        if (self.collisions.left or self.collisions.right) and self.air_time > 4:
             self.wall_slide = True
             # Limit the fall velocity to 0.5
             self.velocity[1] = min(self.velocity[1], 0.5)
 
             # Set the direction of sliding to the correct one
-            if self.collisions["Right"]:
+            if self.collisions.right:
                 # If player slides off the right wall, don't flip the image (default is facing right)
                 self.flip_animation = False
             # Else flip it to the left
@@ -184,15 +246,16 @@ class Player(PhysicsEntity):
         # If the players is dashing in the first 10 frames (dash time), create 15 particles
         if abs(self.dashing) in {60, 50}:
             # Create 15 particles
+            velocities = []
+            frames = []
             for particle_num in range(15):
                 # Calculate the angle, speed and velocity of particles
                 angle = random.random() * math.pi * 2
                 speed = random.random() * 0.5 + 0.5
-                particle_velocity = [math.cos(angle) * speed, math.sin(angle) * speed]
-                # Create a particle with calculated variables
-                self.game.particles.append(Particle(self.game, "normal",
-                                                    self.rect().center, particle_velocity,
-                                                    random.randint(0, 7)))
+                velocities.append((math.cos(angle) * speed, math.sin(angle) * speed))
+                frames.append(random.randint(0, 7))
+            # Create the particles with calculated variables
+            self.game.particles.spawn_many("normal", [self.rect().center] * 15, velocities, frames)
 
         # If player is dashing to the right, decrease the dashing time
         if self.dashing > 0:
@@ -211,8 +274,7 @@ class Player(PhysicsEntity):
             # Make the particle velocity a little random
             particle_velocity = [abs(self.dashing) / self.dashing * random.random() * 3, 0]
             # Spawn the particles at the center of player position, with particle velocity, at random frame
-            self.game.particles.append(Particle(self.game, "normal", self.rect().center,
-                                                particle_velocity, random.randint(0, 7)))
+            self.game.particles.spawn("normal", self.rect().center, particle_velocity, random.randint(0, 7))
 
         # If player velocity is in the right direction, slowly decrease it
         if self.velocity[0] > 0:
@@ -221,11 +283,11 @@ class Player(PhysicsEntity):
         else:
             self.velocity[0] = min(self.velocity[0] + 0.1, 0)
 
-    def draw(self, surface, offset=(0, 0)):
+    def draw(self, surface, offset=(0, 0), outline=None, alpha=1):
         """Draw the player"""
         # If dashing ended, render the player normally
         if abs(self.dashing) <= 50:
-            super().draw(surface, offset)
+            super().draw(surface, offset, outline, alpha)
 
     def jump(self):
         """Make the player jump"""
@@ -271,7 +333,7 @@ class Player(PhysicsEntity):
         # If player isn't dashing
         if not self.dashing:
             # Play the dash sound effect
-            self.game.sound_effects["dash"].play()
+            self.game.audio.play("dash")
             # If dashing to the left, set the dashing direction to left (minus) and time to 60
             if self.flip_animation:
                 self.dashing = -60
@@ -282,6 +344,8 @@ class Player(PhysicsEntity):
 
 class Enemy(PhysicsEntity):
     """Enemy entity"""
+    __slots__ = ("walking",)
+
     def __init__(self, game, pos, size):
         """Initialize the enemy"""
         super().__init__(game, "enemy", pos, size)
@@ -296,7 +360,7 @@ class Enemy(PhysicsEntity):
             if tile_map.solid_check((self.rect().centerx + (-7 if self.flip_animation else 7),
                                      self.pos[1] + 23)):
                 # If there is a wall, change direction
-                if self.collisions["Right"] or self.collisions["Left"]:
+                if self.collisions.right or self.collisions.left:
                     self.flip_animation = not self.flip_animation
                 # If not, move forward
                 else:
@@ -307,8 +371,13 @@ class Enemy(PhysicsEntity):
 
             # Decrease the timer
             self.walking = max(0, self.walking - 1)
-            # If the enemy isn't walking, shoot the projectile
-            if not self.walking:
+            # If the enemy isn't walking and the player is in the line of fire (a band across the whole level, as
+            # high as the rows the player's rectangle can start on less than 16 pixels above or below), shoot
+            bounds = self.game.levels[self.game.level]["bounds"] or (self.pos[0], 0, self.pos[0] + 1, 0)
+            left, right = min(bounds[0], int(self.pos[0])), max(bounds[2], int(self.pos[0]) + 1)
+            top, bottom = int(self.pos[1] - 16), int(self.pos[1] + 16)
+            if not self.walking and self.game.player in self.game.broadphase.query_rect(
+                    (left, top, right - left, bottom - top + 1), ()):
                 # Calculate distance between player and the enemy
                 distance = (self.game.player.pos[0] - self.pos[0], self.game.player.pos[1] - self.pos[1])
                 # If vertical distance between them is lower than 16 pixels
@@ -316,20 +385,19 @@ class Enemy(PhysicsEntity):
                     # If player is on the left, and enemy is facing him, shoot
                     if self.flip_animation and distance[0] < 0:
                         # Shoot sound effect
-                        self.game.sound_effects["shoot"].play()
-                        self.game.projectiles.append(
-                            [[self.rect().centerx - 1, self.rect().centery], -1.5, 0])
+                        self.game.audio.play("shoot")
+                        pos = (self.rect().centerx - 1, self.rect().centery)
+                        self.game.projectiles.spawn(pos, -1.5)
                         for spark_num in range(4):
-                            self.game.sparks.append(Spark(self.game.projectiles[-1][0],
-                                                          random.random() - 0.5 + math.pi, 2 + random.random()))
+                            self.game.sparks.spawn(pos, random.random() - 0.5 + math.pi, 2 + random.random())
                     # If player is on the right, and enemy is facing him, shoot
                     if not self.flip_animation and distance[0] > 0:
                         # Play shoot sound effect
-                        self.game.sound_effects["shoot"].play()
-                        self.game.projectiles.append([[self.rect().centerx + 1, self.rect().centery], 1.5, 0])
+                        self.game.audio.play("shoot")
+                        pos = (self.rect().centerx + 1, self.rect().centery)
+                        self.game.projectiles.spawn(pos, 1.5)
                         for spark_num in range(4):
-                            self.game.sparks.append(Spark(self.game.projectiles[-1][0],
-                                                          random.random() - 0.5, 2 + random.random()))
+                            self.game.sparks.spawn(pos, random.random() - 0.5, 2 + random.random())
 
         # If enemy isn't walking, move every 100 frames for a random time
         elif random.random() < 0.01:
@@ -345,39 +413,51 @@ class Enemy(PhysicsEntity):
 
         # If player is dashing
         if abs(self.game.player.dashing) >= 50:
-            # If enemy collides with player, create sparks and particles
-            if self.rect().colliderect(self.game.player.rect()):
+            # If enemy collides with player (found through the broadphase), create sparks and particles
+            if self.game.player in self.game.broadphase.query_rect(self.rect(), ()):
                 # Play the hit sound effect
-                self.game.sound_effects["hit"].play()
+                self.game.audio.play("hit")
                 # Increase screen shake
                 self.game.camera.screen_shake = max(16, self.game.camera.screen_shake)
                 # Create sparks and particles
+                angles = []
+                speeds = []
+                velocities = []
+                frames = []
                 for particle_num in range(20):
                     # Calculate variables
                     angle = random.random() * math.pi * 2
                     speed = random.random() * 5
                     velocity = [math.cos(angle + math.pi) * speed * 0.5,
                                 math.sin(angle + math.pi) * speed * 0.5]
-                    # Create them
-                    self.game.sparks.append(Spark(self.rect().center, angle, 2 + random.random()))
-                    self.game.particles.append(Particle(self.game, "normal", self.rect().center,
-                                                        velocity, random.randint(0, 7)))
+                    angles.append(angle)
+                    speeds.append(2 + random.random())
+                    velocities.append(velocity)
+                    frames.append(random.randint(0, 7))
+                # Create them
+                self.game.sparks.spawn_many([self.rect().center] * 20, angles, speeds)
+                self.game.particles.spawn_many("normal", [self.rect().center] * 20, velocities, frames)
                 # Add end sparks
-                self.game.sparks.append(Spark(self.rect().center, 0, 5 + random.random()))
-                self.game.sparks.append(Spark(self.rect().center, math.pi, 5 + random.random()))
+                self.game.sparks.spawn(self.rect().center, 0, 5 + random.random())
+                self.game.sparks.spawn(self.rect().center, math.pi, 5 + random.random())
                 return True
 
-    def draw(self, surface, offset=(0, 0)):
+    def draw(self, surface, offset=(0, 0), outline=None, alpha=1):
         """Draw the enemy"""
-        super().draw(surface, offset)
+        super().draw(surface, offset, outline, alpha)
+        # Move the gun with the drawn enemy, it is placed by the rectangle of the last update
+        render_pos = self.render_pos(alpha)
+        offset = (offset[0] + self.pos[0] - render_pos[0], offset[1] + self.pos[1] - render_pos[1])
 
-        # If the enemy is facing left, flip the gun too, place it in the correct placement
+        # If the enemy is facing left, use the flipped gun, place it in the correct placement
         if self.flip_animation:
-            pos_x = self.rect().centerx - 1 - self.game.assets["gun"].get_width() - offset[0]
-            pos_y = self.rect().centery - 1 - self.game.assets["gun"].get_height() + 4 - offset[1]
-            surface.blit(pygame.transform.flip(self.game.assets["gun"], True, False),
-                         (pos_x, pos_y))
+            gun = self.game.assets["gun_flipped"]
+            pos = (self.rect().centerx - 1 - gun.get_width() - offset[0],
+                   self.rect().centery - 1 - gun.get_height() + 4 - offset[1])
         # Else just place it correctly
         else:
-            surface.blit(self.game.assets["gun"], (self.rect().centerx + 1 - offset[0],
-                                                   self.rect().centery - offset[1]))
+            gun = self.game.assets["gun"]
+            pos = (self.rect().centerx + 1 - offset[0], self.rect().centery - offset[1])
+        surface.blit(gun, pos)
+        if outline:
+            outline.add(gun, pos)
@@ -0,0 +1,43 @@
+class EntityStore:
+    """Entities of one kind, spawned, updated, drawn and despawned together"""
+    def __init__(self):
+        """Initialize the empty store"""
+        self.entities = []
+
+    def spawn(self, entity):
+        """Add the entity"""
+        self.entities.append(entity)
+
+    def spawn_many(self, game, entity_class, positions, size):
+        """Create entities of the class at every position"""
+        self.entities.extend(entity_class(game, pos, size) for pos in positions)
+
+    def despawn_many(self, entities):
+        """Remove the entities in one pass"""
+        removed = set(entities)
+        self.entities = [entity for entity in self.entities if entity not in removed]
+
+    def update(self, tile_map, movement=(0, 0)):
+        """Update every entity in the loaded part of the map, despawn the ones that were killed"""
+        # Entities wait where the tiles around them aren't loaded yet, they would collide with solid unloaded chunks
+        killed = [entity for entity in self.entities
+                  if tile_map.area_loaded(entity.rect()) and entity.update(tile_map, movement)]
+        if killed:
+            self.despawn_many(killed)
+
+    def draw(self, surface, offset=(0, 0), outline=None, alpha=1):
+        """Draw every entity"""
+        for entity in self.entities:
+            entity.draw(surface, offset, outline, alpha)
+
+    def clear(self):
+        """Remove every entity"""
+        self.entities.clear()
+
+    def __iter__(self):
+        """Iterate over the entities"""
+        return iter(self.entities)
+
+    def __len__(self):
+        """Return number of entities"""
+        return len(self.entities)
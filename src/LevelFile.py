@@ -0,0 +1,136 @@
+import argparse
+import glob
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+
+class LevelFile:
+    """Binary level file, mapped into memory and read as typed arrays without copying"""
+    # File signature and format version
+    MAGIC = b"PTLV"
+    VERSION = 1
+    # Signature, version, tile size, amount of grid and off-grid tiles and length of the string table
+    PREFIX = struct.Struct("<4sIIIII")
+    # Sections are aligned, so the arrays can be read directly
+    ALIGNMENT = 8
+
+    def __init__(self, path):
+        """Map the file into memory and read its sections"""
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.tile_size, tile_count, deco_count, strings_length = self.PREFIX.unpack_from(self.map)
+        if magic != self.MAGIC or version != self.VERSION:
+            self.map.close()
+            raise ValueError("Not a level file: " + path)
+
+        # Tile type names, type id is the index in this list (0 is empty)
+        offset = self.PREFIX.size
+        self.type_names = [None] + [name.decode() for name in self.map[offset:offset + strings_length].split(b"\0")
+                                    if name]
+        offset = self._align(offset + strings_length)
+
+        # Views of the grid tile arrays and the off-grid ones
+        self.pos_x, offset = self._array(np.int32, tile_count, offset)
+        self.pos_y, offset = self._array(np.int32, tile_count, offset)
+        self.types, offset = self._array(np.uint8, tile_count, offset)
+        self.variants, offset = self._array(np.uint8, tile_count, offset)
+        self.deco_pos_x, offset = self._array(np.float64, deco_count, offset)
+        self.deco_pos_y, offset = self._array(np.float64, deco_count, offset)
+        self.deco_types, offset = self._array(np.uint8, deco_count, offset)
+        self.deco_variants, offset = self._array(np.uint8, deco_count, offset)
+
+    @classmethod
+    def _align(cls, offset):
+        """Return offset moved to the start of the next section"""
+        return -(-offset // cls.ALIGNMENT) * cls.ALIGNMENT
+
+    def _array(self, dtype, count, offset):
+        """Return view of an array in the file and offset of the next section"""
+        array = np.frombuffer(self.map, dtype, count, offset)
+        return array, self._align(offset + array.nbytes)
+
+    @classmethod
+    def is_level(cls, path):
+        """Return if the file is a binary level file"""
+        with open(path, "rb") as file:
+            return file.read(len(cls.MAGIC)) == cls.MAGIC
+
+    @property
+    def off_grid(self):
+        """Return tiles not affected by physics in the JSON level format"""
+        return [{"type": self.type_names[type_id], "variant": variant, "pos": [pos_x, pos_y]}
+                for pos_x, pos_y, type_id, variant in zip(self.deco_pos_x.tolist(), self.deco_pos_y.tolist(),
+                                                          self.deco_types.tolist(), self.deco_variants.tolist())]
+
+    def to_json(self):
+        """Return the whole level in the JSON level format"""
+        tile_map = {str(pos_x) + ';' + str(pos_y): {"type": self.type_names[type_id], "variant": variant,
+                                                    "pos": [pos_x, pos_y]}
+                    for pos_x, pos_y, type_id, variant in zip(self.pos_x.tolist(), self.pos_y.tolist(),
+                                                              self.types.tolist(), self.variants.tolist())}
+        return {"tile_map": tile_map, "tile_size": self.tile_size, "off_grid": self.off_grid}
+
+    def close(self):
+        """Release the views and unmap the file"""
+        self.pos_x = self.pos_y = self.types = self.variants = None
+        self.deco_pos_x = self.deco_pos_y = self.deco_types = self.deco_variants = None
+        self.map.close()
+
+    @classmethod
+    def write(cls, path, data):
+        """Write level in the JSON level format as a binary level file"""
+        # Type names of both tile kinds are interned in one table
+        type_ids = {}
+        for tile in list(data["tile_map"].values()) + data["off_grid"]:
+            if tile["type"] not in type_ids:
+                # Type ids have to fit in a byte
+                if len(type_ids) >= 255:
+                    raise ValueError("Too many tile types")
+                type_ids[tile["type"]] = len(type_ids) + 1
+        strings = b"\0".join(name.encode() for name in type_ids)
+
+        tiles = list(data["tile_map"].values())
+        decos = data["off_grid"]
+        sections = [
+            np.array([int(tile["pos"][0]) for tile in tiles], np.int32),
+            np.array([int(tile["pos"][1]) for tile in tiles], np.int32),
+            np.array([type_ids[tile["type"]] for tile in tiles], np.uint8),
+            np.array([tile["variant"] for tile in tiles], np.uint8),
+            np.array([tile["pos"][0] for tile in decos], np.float64),
+            np.array([tile["pos"][1] for tile in decos], np.float64),
+            np.array([type_ids[tile["type"]] for tile in decos], np.uint8),
+            np.array([tile["variant"] for tile in decos], np.uint8)
+        ]
+
+        with open(path, "wb") as file:
+            file.write(cls.PREFIX.pack(cls.MAGIC, cls.VERSION, data["tile_size"], len(tiles), len(decos),
+                                       len(strings)))
+            for section in [strings] + [section.tobytes() for section in sections]:
+                file.write(section)
+                # Pad the section to the alignment
+                file.write(bytes(cls._align(file.tell()) - file.tell()))
+
+
+if __name__ == "__main__":
+    # Convert levels between the JSON and binary formats, the direction depends on the input file
+    parser = argparse.ArgumentParser(description="Convert levels between the JSON and binary formats, "
+                                                 "the converted files are saved next to them")
+    parser.add_argument("inputs", nargs="*", help="levels to convert, JSON levels of the game by default")
+    arguments = parser.parse_args()
+
+    paths = arguments.inputs or sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                              "../dependencies/data/level*.json")))
+    for path in paths:
+        if LevelFile.is_level(path):
+            level = LevelFile(path)
+            with open(os.path.splitext(path)[0] + ".json", "w") as output:
+                json.dump(level.to_json(), output)
+            level.close()
+        else:
+            with open(path, "r") as source:
+                LevelFile.write(os.path.splitext(path)[0] + ".level", json.load(source))
+        print("Converted " + path)
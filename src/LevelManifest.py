@@ -0,0 +1,153 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+
+from src.LevelFile import LevelFile
+from src.RegionFile import RegionFile
+
+
+class LevelManifest:
+    """List of the game's levels with their metadata, kept in a JSON file next to them"""
+    # Names of level files, with the level name and format
+    LEVEL_NAME = re.compile(r"^(level\d+)\.(region|level|json)$")
+    # Formats of the same level from the preferred one, converted levels are used instead of their JSON files
+    FORMATS = ("region", "level", "json")
+
+    def __init__(self, directory, name="manifest.json"):
+        """Initialize the manifest of levels in the directory"""
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, name)
+        # Level entries in the order they are played
+        self.levels = []
+
+    def update(self, rebuild=False):
+        """Load the manifest, add new levels and refresh changed (or all) ones, save it if anything changed"""
+        saved = []
+        try:
+            with open(self.manifest_path, "r") as file:
+                saved = json.load(file)["levels"]
+        # Missing or broken manifest is built again
+        except (OSError, ValueError, KeyError):
+            pass
+
+        # Every format of every level in the directory
+        found = {}
+        for file_name in os.listdir(self.directory):
+            match = self.LEVEL_NAME.match(file_name)
+            if match:
+                found.setdefault(match.group(1), {})[match.group(2)] = file_name
+        # Level files in the preferred formats by level names
+        files = {name: next(formats[level_format] for level_format in self.FORMATS if level_format in formats)
+                 for name, formats in found.items()}
+
+        # Saved levels keep their order, new ones are added after them by their numbers
+        names = [entry["name"] for entry in saved if entry["name"] in files]
+        names += sorted((name for name in files if name not in names), key=lambda name: int(name[5:]))
+        entries = {entry["name"]: entry for entry in saved}
+        self.levels = [self._refresh(None if rebuild else entries.get(name), name, files[name]) for name in names]
+
+        if self.levels != saved:
+            self.save()
+
+    def _refresh(self, entry, name, file_name):
+        """Return entry of the level, read the level only if its file changed"""
+        content_hash = self.hash_file(os.path.join(self.directory, file_name))
+        if entry and entry["path"] == file_name and entry["hash"] == content_hash:
+            return entry
+        return self.describe(name, file_name, content_hash)
+
+    def describe(self, name, file_name, content_hash):
+        """Return entry of the level with metadata read from its file"""
+        data = self.read_level(os.path.join(self.directory, file_name))
+        tiles = list(data["tile_map"].values())
+
+        # Counts of tiles by their types
+        types = {}
+        for tile in tiles + data["off_grid"]:
+            types[tile["type"]] = types.get(tile["type"], 0) + 1
+
+        # Spawners in pixels, like the game extracts them
+        spawners = [tile for tile in data["off_grid"] if tile["type"] == "spawners"]
+        spawners += [{"variant": tile["variant"],
+                      "pos": [tile["pos"][0] * data["tile_size"], tile["pos"][1] * data["tile_size"]]}
+                     for tile in tiles if tile["type"] == "spawners"]
+        player = [spawner["pos"] for spawner in spawners if spawner["variant"] == 0]
+
+        # Bounds of the grid tiles in pixels (left, top, right, bottom)
+        bounds = None
+        if tiles:
+            positions_x = [tile["pos"][0] for tile in tiles]
+            positions_y = [tile["pos"][1] for tile in tiles]
+            bounds = [min(positions_x) * data["tile_size"], min(positions_y) * data["tile_size"],
+                      (max(positions_x) + 1) * data["tile_size"], (max(positions_y) + 1) * data["tile_size"]]
+
+        return {"name": name, "path": file_name, "hash": content_hash, "tile_size": data["tile_size"],
+                "bounds": bounds, "tiles": len(tiles), "off_grid": len(data["off_grid"]), "types": types,
+                "player": player[-1] if player else None,
+                "enemies": [spawner["pos"] for spawner in spawners if spawner["variant"] == 1]}
+
+    @staticmethod
+    def read_level(path):
+        """Return level from a file of any format in the JSON level format"""
+        if RegionFile.is_region(path):
+            level = RegionFile(path)
+        elif LevelFile.is_level(path):
+            level = LevelFile(path)
+        else:
+            with open(path, "r") as file:
+                return json.load(file)
+        data = level.to_json()
+        level.close()
+        return data
+
+    @staticmethod
+    def hash_file(path):
+        """Return hash of the file's content"""
+        content_hash = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                content_hash.update(block)
+        return content_hash.hexdigest()
+
+    def save(self):
+        """Save the manifest, skip it if it can't be written (read-only install), the levels stay in memory"""
+        try:
+            with open(self.manifest_path, "w") as file:
+                json.dump({"levels": self.levels}, file, indent=1)
+        except OSError:
+            pass
+
+    def validate(self, level_id):
+        """Return if the level file still has the content described in the manifest"""
+        entry = self.levels[level_id]
+        return self.hash_file(os.path.join(self.directory, entry["path"])) == entry["hash"]
+
+    def path(self, level_id):
+        """Return path of the level file"""
+        return os.path.join(self.directory, self.levels[level_id]["path"])
+
+    def __getitem__(self, level_id):
+        """Return entry of the level"""
+        return self.levels[level_id]
+
+    def __len__(self):
+        """Return amount of levels"""
+        return len(self.levels)
+
+
+if __name__ == "__main__":
+    # Build the manifest of the game's levels, run as a module from the main directory
+    parser = argparse.ArgumentParser(description="Build the manifest of levels")
+    parser.add_argument("--directory", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                            "../dependencies/data"),
+                        help="directory of the levels")
+    parser.add_argument("--rebuild", action="store_true", help="read every level again")
+    arguments = parser.parse_args()
+
+    manifest = LevelManifest(arguments.directory)
+    manifest.update(arguments.rebuild)
+    for level_id, level in enumerate(manifest.levels):
+        print(str(level_id) + ": " + level["path"] + ", " + str(level["tiles"]) + " tiles, "
+              + str(len(level["enemies"])) + " enemies")
@@ -0,0 +1,64 @@
+import math
+
+import pygame
+
+
+class Outline:
+    """Silhouette of the foreground, drawn as an outline below it"""
+    # Offsets of the outline around the silhouette
+    OFFSETS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+    def __init__(self, size, color=(0, 0, 0, 180)):
+        """Initialize the outline with preallocated masks and surface"""
+        # Color of the outline
+        self.color = color
+        # Silhouette of the tile map, kept while the camera stays on the same pixel
+        self.static_mask = pygame.Mask(size)
+        # Camera position and chunk cache version the static silhouette was made for
+        self.static_key = None
+        # Silhouette of everything drawn this frame
+        self.mask = pygame.Mask(size)
+        # Surface the silhouette is drawn to
+        self.surface = pygame.Surface(size, pygame.SRCALPHA)
+
+        # Masks of sprite images
+        self.sprite_masks = {}
+
+    def begin(self, tile_map, surface, offset=(0, 0)):
+        """Start silhouette of a new frame with the tile map already drawn on the surface"""
+        self.mask.clear()
+        # Without cached chunks, take the silhouette of the drawn tile map
+        if not tile_map.chunk_cache:
+            self.add_region(surface, surface.get_rect())
+            return
+
+        # Compose the static silhouette again only if the camera moved by whole pixels or tiles changed
+        key = (math.floor(offset[0]), math.floor(offset[1]), tile_map.chunk_cache.version)
+        if key != self.static_key:
+            self.static_mask.clear()
+            tile_map.chunk_cache.draw_mask(self.static_mask, offset)
+            self.static_key = key
+        self.mask.draw(self.static_mask, (0, 0))
+
+    def sprite_mask(self, image):
+        """Return the cached mask of the image"""
+        if image not in self.sprite_masks:
+            self.sprite_masks[image] = pygame.mask.from_surface(image)
+        return self.sprite_masks[image]
+
+    def add(self, image, pos):
+        """Add the image drawn at the position to the silhouette"""
+        # Truncate the position like blitting does
+        self.mask.draw(self.sprite_mask(image), (int(pos[0]), int(pos[1])))
+
+    def add_region(self, surface, rect):
+        """Add everything drawn in the region of the surface to the silhouette"""
+        rect = pygame.Rect(rect).clip(surface.get_rect())
+        if rect:
+            self.mask.draw(pygame.mask.from_surface(surface.subsurface(rect)), rect.topleft)
+
+    def draw(self, surface):
+        """Draw the outline of the silhouette on the surface"""
+        self.mask.to_surface(self.surface, setcolor=self.color, unsetcolor=(0, 0, 0, 0))
+        for offset in self.OFFSETS:
+            surface.blit(self.surface, offset)
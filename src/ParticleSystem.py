@@ -0,0 +1,112 @@
+import numpy as np
+
+from src.ArrayStore import ArrayStore
+
+
+class ParticleSystem(ArrayStore):
+    """Particles stored in NumPy arrays, updated and drawn all at once"""
+    # Arrays with one value per particle and their types
+    FIELDS = (("pos_x", np.float64), ("pos_y", np.float64), ("velocity_x", np.float64),
+              ("velocity_y", np.float64), ("frame", np.int32), ("type", np.int32), ("end", np.bool_))
+    # Positions are drawn between steps
+    INTERPOLATED = ("pos_x", "pos_y")
+
+    def __init__(self, animations, sway=None, capacity=256):
+        """Initialize the particle system"""
+        super().__init__(capacity)
+        # Particle type names, type id is the index
+        self.types = list(animations)
+        # Type ids by their names
+        self.type_ids = {name: type_id for type_id, name in enumerate(self.types)}
+
+        # All frames of every type in one list, so they can be picked by one index
+        self.frames = []
+        # Index of the first frame of every type
+        self.first_frame = np.zeros(len(self.types), np.int32)
+        # Frame durations of every type
+        self.duration = np.zeros(len(self.types), np.int32)
+        # Last animation frame of every type
+        self.last_frame = np.zeros(len(self.types), np.int32)
+        for type_id, name in enumerate(self.types):
+            animation = animations[name]
+            self.first_frame[type_id] = len(self.frames)
+            self.duration[type_id] = animation.duration
+            self.last_frame[type_id] = animation.length - 1
+            self.frames.extend(animation.images)
+        # Half sizes of frames to center them
+        self.half_width = np.array([image.get_width() // 2 for image in self.frames], np.int32)
+        self.half_height = np.array([image.get_height() // 2 for image in self.frames], np.int32)
+
+        # Horizontal sway of types (speed, strength), so they seem like they float
+        self.sway_speed = np.zeros(len(self.types))
+        self.sway_strength = np.zeros(len(self.types))
+        for name, (speed, strength) in (sway or {}).items():
+            self.sway_speed[self.type_ids[name]] = speed
+            self.sway_strength[self.type_ids[name]] = strength
+
+    def spawn(self, particle_type, pos, velocity=(0, 0), frame=0):
+        """Spawn a particle"""
+        index = self._reserve(1).start
+        self.pos_x[index], self.pos_y[index] = pos
+        self.velocity_x[index], self.velocity_y[index] = velocity
+        self.frame[index] = frame
+        self.type[index] = self.type_ids[particle_type]
+        self.end[index] = False
+        self._spawned(index)
+
+    def spawn_many(self, particle_type, positions, velocities, frames):
+        """Spawn many particles of the same type at once"""
+        positions = np.asarray(positions, np.float64).reshape(-1, 2)
+        velocities = np.asarray(velocities, np.float64).reshape(-1, 2)
+        new = self._reserve(len(positions))
+        self.pos_x[new] = positions[:, 0]
+        self.pos_y[new] = positions[:, 1]
+        self.velocity_x[new] = velocities[:, 0]
+        self.velocity_y[new] = velocities[:, 1]
+        self.frame[new] = frames
+        self.type[new] = self.type_ids[particle_type]
+        self.end[new] = False
+        self._spawned(new)
+
+    def update(self):
+        """Update positions and animation frames, remove finished particles"""
+        active = slice(0, self.count)
+        # Particles that finished their animation the last frame will be removed
+        finished = self.end[active].copy()
+        self._save_previous()
+
+        # Update positions
+        self.pos_x[active] += self.velocity_x[active]
+        self.pos_y[active] += self.velocity_y[active]
+
+        # Update animations without looping
+        types = self.type[active]
+        last_frame = self.last_frame[types]
+        np.minimum(self.frame[active] + 1, last_frame, out=self.frame[active])
+        self.end[active] |= self.frame[active] >= last_frame
+
+        # Sway the particles that float
+        self.pos_x[active] += np.sin(self.frame[active] * self.sway_speed[types]) * self.sway_strength[types]
+
+        # Remove the finished particles
+        if finished.any():
+            self._compact(~finished)
+
+    def draw(self, surface, offset=(0, 0), outline=None, alpha=1):
+        """Draw visible particles in one batch (alpha of the way from the previous step), add them to the outline"""
+        active = slice(0, self.count)
+        # Frame image of every particle
+        images = self.first_frame[self.type[active]] + self.frame[active] // self.duration[self.type[active]]
+        # Top left corners of the images on surface
+        draw_x = (self._interpolate("pos_x", alpha) - offset[0] - self.half_width[images]).astype(np.int32)
+        draw_y = (self._interpolate("pos_y", alpha) - offset[1] - self.half_height[images]).astype(np.int32)
+
+        # Skip the particles outside of the surface
+        visible = ((draw_x < surface.get_width()) & (draw_y < surface.get_height()) &
+                   (draw_x + 2 * self.half_width[images] > -1) & (draw_y + 2 * self.half_height[images] > -1))
+        images = [self.frames[image] for image in images[visible].tolist()]
+        positions = list(zip(draw_x[visible].tolist(), draw_y[visible].tolist()))
+        surface.blits(zip(images, positions), False)
+        if outline:
+            for image, pos in zip(images, positions):
+                outline.add(image, pos)
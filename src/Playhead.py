@@ -0,0 +1,32 @@
+class Playhead:
+    """Position in an animation clip, the only animation state every entity owns"""
+    __slots__ = ("animation", "frame", "end")
+
+    def __init__(self, animation):
+        """Initialize the playhead at the start of the animation"""
+        self.animation = animation
+        self.frame = 0
+        self.end = False
+
+    def play(self, animation):
+        """Start playing the animation from the beginning"""
+        self.animation = animation
+        self.frame = 0
+        self.end = False
+
+    def update(self, frames=1):
+        """Advance by given number of frames at once"""
+        length = self.animation.length
+        # Loop the animation if needed
+        if self.animation.loop:
+            self.frame = (self.frame + frames) % length
+
+        # Stop at the last frame without looping and end the animation
+        else:
+            self.frame = min(self.frame + frames, length - 1)
+            if self.frame >= length - 1:
+                self.end = True
+
+    def get_frame_image(self, variant=None):
+        """Get the current frame image, or its variant"""
+        return self.animation.get_image(self.frame, variant)
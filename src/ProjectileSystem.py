@@ -0,0 +1,81 @@
+import numpy as np
+
+from src.ArrayStore import ArrayStore
+
+
+class ProjectileSystem(ArrayStore):
+    """Projectiles stored in NumPy arrays, moved and tested for hits all at once"""
+    # Arrays with one value per projectile and their types
+    FIELDS = (("pos_x", np.float64), ("pos_y", np.float64), ("direction", np.float64), ("timer", np.int32))
+    # Positions are drawn between steps
+    INTERPOLATED = ("pos_x", "pos_y")
+
+    def __init__(self, image, lifetime=360, capacity=64):
+        """Initialize the projectile system"""
+        super().__init__(capacity)
+        # Image of the projectiles
+        self.image = image
+        # Frames after which projectiles disappear
+        self.lifetime = lifetime
+
+    def spawn(self, pos, direction):
+        """Spawn a projectile flying horizontally in the direction (pixels per frame)"""
+        index = self._reserve(1).start
+        self.pos_x[index], self.pos_y[index] = pos
+        self.direction[index] = direction
+        self.timer[index] = 0
+        self._spawned(index)
+
+    def update(self, solidity, tile_size, target=None, loaded=None):
+        """Move and age projectiles, remove hit and expired ones, return the hits (x, y, direction, target flags)"""
+        active = slice(0, self.count)
+        pos_x, pos_y = self.pos_x[active], self.pos_y[active]
+        self._save_previous()
+        # Projectiles wait where the tiles aren't loaded, loaded tells which positions in the arrays have them
+        moving = loaded(pos_x, pos_y) if loaded else None
+        # Move and age every projectile
+        if moving is None or moving.all():
+            pos_x += self.direction[active]
+            self.timer[active] += 1
+        # Or only the ones with loaded tiles
+        else:
+            pos_x[moving] += self.direction[active][moving]
+            self.timer[active][moving] += 1
+
+        # Gather solidity of the tiles under the projectiles at once
+        tile_hit = solidity.get_many(np.floor_divide(pos_x, tile_size).astype(np.int64),
+                                     np.floor_divide(pos_y, tile_size).astype(np.int64))
+        # Tiles that aren't loaded are solid only until they are, nothing hits them
+        if loaded:
+            tile_hit &= loaded(pos_x, pos_y)
+        expired = ~tile_hit & (self.timer[active] > self.lifetime)
+
+        # Test the remaining ones against the target's bounding box (points are truncated like in rectangles)
+        target_hit = np.zeros(self.count, np.bool_)
+        if target:
+            point_x, point_y = np.trunc(pos_x), np.trunc(pos_y)
+            target_hit = (~tile_hit & ~expired & (point_x >= target.left) & (point_x < target.right) &
+                          (point_y >= target.top) & (point_y < target.bottom))
+
+        # Save the hits before removing them
+        hit = tile_hit | target_hit
+        hits = (pos_x[hit], pos_y[hit], self.direction[active][hit], target_hit[hit])
+        removed = hit | expired
+        if removed.any():
+            self._compact(~removed)
+        return hits
+
+    def draw(self, surface, offset=(0, 0), outline=None, alpha=1):
+        """Draw visible projectiles in one batch (alpha of the way from the previous step), add them to the outline"""
+        # Top left corners of the images on surface
+        draw_x = (self._interpolate("pos_x", alpha) - self.image.get_width() / 2 - offset[0]).astype(np.int32)
+        draw_y = (self._interpolate("pos_y", alpha) - self.image.get_height() / 2 - offset[1]).astype(np.int32)
+
+        # Skip the projectiles outside of the surface
+        visible = ((draw_x < surface.get_width()) & (draw_y < surface.get_height()) &
+                   (draw_x + self.image.get_width() > 0) & (draw_y + self.image.get_height() > 0))
+        positions = list(zip(draw_x[visible].tolist(), draw_y[visible].tolist()))
+        surface.blits([(self.image, pos) for pos in positions], False)
+        if outline:
+            for pos in positions:
+                outline.add(self.image, pos)
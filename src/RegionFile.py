@@ -0,0 +1,140 @@
+import argparse
+import json
+import struct
+import threading
+import zlib
+
+
+class RegionFile:
+    """Level file with grid tiles in compressed chunks, found through an index in the header"""
+    # File signature and format version
+    MAGIC = b"PTRG"
+    VERSION = 1
+    # Signature, version and length of the JSON header at the start of the file
+    PREFIX = struct.Struct("<4sII")
+    # Grid tile types needed when the level starts (like spawners), their chunks are always loaded
+    PINNED_TYPES = {"spawners"}
+
+    def __init__(self, path):
+        """Open the region file and read its header"""
+        self.path = path
+        self.file = open(path, "rb")
+        # Reads come from the streaming thread too
+        self.lock = threading.Lock()
+
+        magic, version, header_length = self.PREFIX.unpack(self.file.read(self.PREFIX.size))
+        if magic != self.MAGIC or version != self.VERSION:
+            self.file.close()
+            raise ValueError("Not a region file: " + path)
+        header = json.loads(self.file.read(header_length))
+        # Chunk payloads start right after the header
+        self.data_start = self.PREFIX.size + header_length
+
+        self.tile_size = header["tile_size"]
+        self.chunk_size = header["chunk_size"]
+        # Tile type names, type id is the index in this list (0 is empty)
+        self.type_names = [None] + header["types"]
+        # Tiles not affected by physics are small, they are loaded with the header
+        self.off_grid = header["off_grid"]
+        # Offsets and lengths of the payloads (from the end of the header) by chunk position
+        self.index = {(chunk_x, chunk_y): (offset, length) for chunk_x, chunk_y, offset, length in header["index"]}
+        # Chunks with the pinned tile types
+        self.pinned = [tuple(key) for key in header["pinned"]]
+
+    @classmethod
+    def is_region(cls, path):
+        """Return if the file is a region file"""
+        with open(path, "rb") as file:
+            return file.read(len(cls.MAGIC)) == cls.MAGIC
+
+    def read_chunk(self, key):
+        """Return type ids and variants of the chunk's tiles, safe to call from any thread"""
+        offset, length = self.index[key]
+        with self.lock:
+            self.file.seek(self.data_start + offset)
+            payload = self.file.read(length)
+        # Decompressing doesn't need the lock
+        data = zlib.decompress(payload)
+        area = self.chunk_size * self.chunk_size
+        return data[:area], data[area:]
+
+    def to_json(self):
+        """Return the whole level in the JSON level format"""
+        tile_map = {}
+        size = self.chunk_size
+        for chunk_x, chunk_y in self.index:
+            types, variants = self.read_chunk((chunk_x, chunk_y))
+            for index, type_id in enumerate(types):
+                if type_id:
+                    pos_x, pos_y = chunk_x * size + index % size, chunk_y * size + index // size
+                    tile_map[str(pos_x) + ';' + str(pos_y)] = {"type": self.type_names[type_id],
+                                                               "variant": variants[index], "pos": [pos_x, pos_y]}
+        return {"tile_map": tile_map, "tile_size": self.tile_size, "off_grid": self.off_grid}
+
+    def close(self):
+        """Close the file"""
+        self.file.close()
+
+    @classmethod
+    def write(cls, path, data, chunk_size=16):
+        """Write level in the JSON level format as a region file"""
+        type_names = [None]
+        type_ids = {}
+        chunks = {}
+        area = chunk_size * chunk_size
+        # Sort grid tiles into chunks of type ids and variants
+        for tile in data["tile_map"].values():
+            pos_x, pos_y = int(tile["pos"][0]), int(tile["pos"][1])
+            key = (pos_x // chunk_size, pos_y // chunk_size)
+            if key not in chunks:
+                chunks[key] = (bytearray(area), bytearray(area))
+            if tile["type"] not in type_ids:
+                # Type ids have to fit in a byte
+                if len(type_names) > 255:
+                    raise ValueError("Too many tile types")
+                type_ids[tile["type"]] = len(type_names)
+                type_names.append(tile["type"])
+            index = (pos_y % chunk_size) * chunk_size + pos_x % chunk_size
+            chunks[key][0][index] = type_ids[tile["type"]]
+            chunks[key][1][index] = tile["variant"]
+
+        # Compress every chunk, row by row from the top left so nearby chunks are close in the file
+        index = []
+        payloads = []
+        offset = 0
+        for key in sorted(chunks, key=lambda key: (key[1], key[0])):
+            payload = zlib.compress(bytes(chunks[key][0] + chunks[key][1]))
+            index.append([key[0], key[1], offset, len(payload)])
+            payloads.append(payload)
+            offset += len(payload)
+
+        pinned_ids = {type_ids[name] for name in cls.PINNED_TYPES if name in type_ids}
+        header = json.dumps({
+            "tile_size": data["tile_size"], "chunk_size": chunk_size, "types": type_names[1:],
+            "off_grid": data["off_grid"], "index": index,
+            "pinned": [list(key) for key, (types, variants) in chunks.items() if pinned_ids & set(types)]
+        }).encode()
+
+        with open(path, "wb") as file:
+            file.write(cls.PREFIX.pack(cls.MAGIC, cls.VERSION, len(header)))
+            file.write(header)
+            for payload in payloads:
+                file.write(payload)
+
+
+if __name__ == "__main__":
+    # Convert levels between the JSON and region formats, the direction depends on the input file
+    parser = argparse.ArgumentParser(description="Convert a level between the JSON and region formats")
+    parser.add_argument("input", help="level to convert")
+    parser.add_argument("output", help="converted level")
+    parser.add_argument("--chunk-size", type=int, default=16, help="chunk size of the region file in tiles")
+    arguments = parser.parse_args()
+
+    if RegionFile.is_region(arguments.input):
+        region = RegionFile(arguments.input)
+        with open(arguments.output, "w") as output:
+            json.dump(region.to_json(), output)
+        region.close()
+    else:
+        with open(arguments.input, "r") as level:
+            RegionFile.write(arguments.output, json.load(level), arguments.chunk_size)
@@ -0,0 +1,148 @@
+import numpy as np
+
+
+class SolidityMap:
+    """Dense bitmap of solid grid tiles covering the bounds of the level"""
+    def __init__(self, margin=8):
+        """Initialize empty bitmap"""
+        # Extra tiles added to every side when the bitmap has to grow
+        self.margin = margin
+        # Grid position of the first cell
+        self.origin = (0, 0)
+        # Size in tiles
+        self.width = 0
+        self.height = 0
+        # Cells, row by row (1 means solid)
+        self.bits = bytearray()
+
+    def build(self, grid):
+        """Build the bitmap from the tile grid"""
+        solid = [(pos_x, pos_y) for pos_x, pos_y, tile_type, variant in grid.tiles()
+                 if tile_type in grid.solid_types]
+        # Empty level doesn't need any cells
+        if not solid:
+            self.clear()
+            return
+
+        # Calculate the bounds of solid tiles
+        left = min(pos[0] for pos in solid)
+        top = min(pos[1] for pos in solid)
+        self.origin = (left, top)
+        self.width = max(pos[0] for pos in solid) - left + 1
+        self.height = max(pos[1] for pos in solid) - top + 1
+        self.bits = bytearray(self.width * self.height)
+        # Mark every solid tile
+        for pos_x, pos_y in solid:
+            self.bits[(pos_y - top) * self.width + pos_x - left] = 1
+
+    def build_arrays(self, pos_x, pos_y):
+        """Build the bitmap from arrays of solid grid positions"""
+        if not len(pos_x):
+            self.clear()
+            return
+
+        # Calculate the bounds and mark every position at once
+        left, top = int(pos_x.min()), int(pos_y.min())
+        self.origin = (left, top)
+        self.width = int(pos_x.max()) - left + 1
+        self.height = int(pos_y.max()) - top + 1
+        bits = np.zeros(self.width * self.height, np.uint8)
+        bits[(pos_y.astype(np.int64) - top) * self.width + pos_x - left] = 1
+        self.bits = bytearray(bits.tobytes())
+
+    def clear(self):
+        """Remove all cells"""
+        self.origin = (0, 0)
+        self.width = 0
+        self.height = 0
+        self.bits = bytearray()
+
+    def get(self, pos_x, pos_y):
+        """Return if the grid position is solid"""
+        pos_x -= self.origin[0]
+        pos_y -= self.origin[1]
+        # Everything outside the bounds is empty
+        if 0 <= pos_x < self.width and 0 <= pos_y < self.height:
+            return self.bits[pos_y * self.width + pos_x]
+        return 0
+
+    def get_many(self, pos_x, pos_y):
+        """Return if the grid positions in the arrays are solid, in one gather"""
+        pos_x = pos_x - self.origin[0]
+        pos_y = pos_y - self.origin[1]
+        # Everything outside the bounds is empty
+        inside = (pos_x >= 0) & (pos_x < self.width) & (pos_y >= 0) & (pos_y < self.height)
+        solid = np.zeros(len(pos_x), np.bool_)
+        solid[inside] = np.frombuffer(self.bits, np.uint8)[pos_y[inside] * self.width + pos_x[inside]] != 0
+        return solid
+
+    def cells_in(self, left, top, right, bottom):
+        """Return grid positions of solid cells in the inclusive range"""
+        # Clip the range to the bounds
+        left = max(left, self.origin[0]) - self.origin[0]
+        top = max(top, self.origin[1]) - self.origin[1]
+        right = min(right - self.origin[0], self.width - 1)
+        bottom = min(bottom - self.origin[1], self.height - 1)
+
+        cells = []
+        for row in range(top, bottom + 1):
+            start = row * self.width
+            for column in range(left, right + 1):
+                if self.bits[start + column]:
+                    cells.append((column + self.origin[0], row + self.origin[1]))
+        return cells
+
+    def set(self, pos_x, pos_y, solid):
+        """Set solidity of the grid position"""
+        local_x = pos_x - self.origin[0]
+        local_y = pos_y - self.origin[1]
+        if not (0 <= local_x < self.width and 0 <= local_y < self.height):
+            # Nothing to clear outside the bounds
+            if not solid:
+                return
+            self._grow(pos_x, pos_y)
+            local_x = pos_x - self.origin[0]
+            local_y = pos_y - self.origin[1]
+        self.bits[local_y * self.width + local_x] = 1 if solid else 0
+
+    def fill(self, left, top, width, cells):
+        """Set solidity of a block of grid positions, cells are its rows one after another (1 means solid)"""
+        height = len(cells) // width
+        # Grow the bitmap to cover the corners, an empty block doesn't need it (everything outside is empty)
+        if any(cells):
+            for pos_x, pos_y in ((left, top), (left + width - 1, top + height - 1)):
+                if not (0 <= pos_x - self.origin[0] < self.width and 0 <= pos_y - self.origin[1] < self.height):
+                    self._grow(pos_x, pos_y)
+
+        # Copy the rows, clipped to the bounds
+        local_x = left - self.origin[0]
+        start, end = max(local_x, 0), min(local_x + width, self.width)
+        for row in range(height):
+            local_y = top + row - self.origin[1]
+            if start < end and 0 <= local_y < self.height:
+                self.bits[local_y * self.width + start:local_y * self.width + end] = \
+                    cells[row * width + start - local_x:row * width + end - local_x]
+
+    def _grow(self, pos_x, pos_y):
+        """Grow the bitmap, so it covers the grid position"""
+        # Calculate new bounds with margin around them
+        if self.width:
+            left = min(self.origin[0], pos_x - self.margin)
+            top = min(self.origin[1], pos_y - self.margin)
+            right = max(self.origin[0] + self.width, pos_x + self.margin + 1)
+            bottom = max(self.origin[1] + self.height, pos_y + self.margin + 1)
+        else:
+            left, top = pos_x - self.margin, pos_y - self.margin
+            right, bottom = pos_x + self.margin + 1, pos_y + self.margin + 1
+
+        # Copy the old rows into the new bitmap
+        width = right - left
+        bits = bytearray(width * (bottom - top))
+        for row in range(self.height):
+            start = (self.origin[1] + row - top) * width + self.origin[0] - left
+            bits[start:start + self.width] = self.bits[row * self.width:(row + 1) * self.width]
+
+        self.origin = (left, top)
+        self.width = width
+        self.height = bottom - top
+        self.bits = bits
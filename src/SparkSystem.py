@@ -0,0 +1,82 @@
+import numpy as np
+import pygame
+
+from src.ArrayStore import ArrayStore
+
+
+class SparkSystem(ArrayStore):
+    """Sparks stored in NumPy arrays, updated and drawn all at once"""
+    # Arrays with one value per spark and their types
+    FIELDS = (("pos_x", np.float64), ("pos_y", np.float64), ("cos", np.float64), ("sin", np.float64),
+              ("speed", np.float64))
+    # Positions are drawn between steps
+    INTERPOLATED = ("pos_x", "pos_y")
+
+    def __init__(self, color=(255, 255, 255), capacity=256):
+        """Initialize the spark system"""
+        super().__init__(capacity)
+        # Color of sparks
+        self.color = color
+
+    def spawn(self, pos, angle, speed):
+        """Spawn a spark"""
+        index = self._reserve(1).start
+        self.pos_x[index], self.pos_y[index] = pos
+        # Direction never changes, so calculate it once
+        self.cos[index] = np.cos(angle)
+        self.sin[index] = np.sin(angle)
+        self.speed[index] = speed
+        self._spawned(index)
+
+    def spawn_many(self, positions, angles, speeds):
+        """Spawn many sparks at once"""
+        positions = np.asarray(positions, np.float64).reshape(-1, 2)
+        angles = np.asarray(angles, np.float64)
+        new = self._reserve(len(positions))
+        self.pos_x[new] = positions[:, 0]
+        self.pos_y[new] = positions[:, 1]
+        self.cos[new] = np.cos(angles)
+        self.sin[new] = np.sin(angles)
+        self.speed[new] = speeds
+        self._spawned(new)
+
+    def update(self):
+        """Update positions and speeds, remove the stopped sparks"""
+        active = slice(0, self.count)
+        speed = self.speed[active]
+        self._save_previous()
+        # Update positions
+        self.pos_x[active] += self.cos[active] * speed
+        self.pos_y[active] += self.sin[active] * speed
+
+        # Make the sparks slower each frame, remove the ones that stopped
+        np.maximum(speed - 0.1, 0, out=speed)
+        stopped = speed == 0
+        if stopped.any():
+            self._compact(~stopped)
+
+    def draw(self, surface, offset=(0, 0), alpha=1):
+        """Draw the visible sparks (alpha of the way from the previous step), return the rectangle they were drawn in"""
+        active = slice(0, self.count)
+        pos_x = self._interpolate("pos_x", alpha) - offset[0]
+        pos_y = self._interpolate("pos_y", alpha) - offset[1]
+        speed = self.speed[active]
+
+        # Skip the sparks outside of the surface (the longest diagonal of diamond is 3 times the speed)
+        reach = speed * 3
+        visible = ((pos_x + reach >= 0) & (pos_x - reach < surface.get_width()) &
+                   (pos_y + reach >= 0) & (pos_y - reach < surface.get_height()))
+        if not visible.any():
+            return None
+        pos_x, pos_y, speed = pos_x[visible], pos_y[visible], speed[visible]
+        cos, sin = self.cos[active][visible], self.sin[active][visible]
+
+        # Calculate points of every diamond at once: front, right, back and left
+        long_x, long_y = cos * speed * 3, sin * speed * 3
+        short_x, short_y = -sin * speed * 0.5, cos * speed * 0.5
+        points = np.stack((pos_x + long_x, pos_y + long_y, pos_x + short_x, pos_y + short_y,
+                           pos_x - long_x, pos_y - long_y, pos_x - short_x, pos_y - short_y), 1)
+
+        # Draw them
+        rects = [pygame.draw.polygon(surface, self.color, diamond) for diamond in points.reshape(-1, 4, 2).tolist()]
+        return rects[0].unionall(rects)
@@ -0,0 +1,158 @@
+import math
+
+import numpy as np
+import pygame
+
+
+class SpatialHash:
+    """Uniform grid of buckets indexing rectangles by their bounds"""
+    def __init__(self, cell_size=64):
+        """Initialize the spatial hash"""
+        # Size of a bucket in pixels
+        self.cell_size = cell_size
+        # Items in every bucket by bucket position
+        self.cells = {}
+        # Rectangles of items
+        self.rects = {}
+        # Items inserted in bulk by their tags: sorted bucket keys, item indices and bounds of their rectangles
+        self.batches = {}
+
+    def _cells(self, rect):
+        """Return range of buckets covered by rectangle"""
+        size = self.cell_size
+        return (range(math.floor(rect.left / size), math.floor((rect.right - 1) / size) + 1),
+                range(math.floor(rect.top / size), math.floor((rect.bottom - 1) / size) + 1))
+
+    @staticmethod
+    def _key(cell_x, cell_y):
+        """Return bucket position packed into one integer, works for numbers and arrays alike"""
+        return (cell_x << 32) | (cell_y & 0xFFFFFFFF)
+
+    def insert(self, item, rect):
+        """Insert item with given rectangle"""
+        rect = pygame.Rect(rect)
+        self.rects[item] = rect
+        range_x, range_y = self._cells(rect)
+        for cell_x in range_x:
+            for cell_y in range_y:
+                self.cells.setdefault((cell_x, cell_y), set()).add(item)
+
+    def insert_many(self, tag, left, top, width, height):
+        """Insert items (tag, index) with rectangles given by arrays, replace the earlier ones with the tag"""
+        # Positions are truncated like in rectangles
+        left = np.trunc(left).astype(np.int64)
+        top = np.trunc(top).astype(np.int64)
+        right, bottom = left + width, top + height
+        size = self.cell_size
+        first_x, last_x = left // size, (right - 1) // size
+        first_y, last_y = top // size, (bottom - 1) // size
+
+        # Put every item in each bucket its rectangle covers, a step at a time for all of them
+        indices = np.arange(len(left))
+        keys = []
+        items = []
+        for step_x in range(int((last_x - first_x).max(initial=0)) + 1):
+            for step_y in range(int((last_y - first_y).max(initial=0)) + 1):
+                covered = (first_x + step_x <= last_x) & (first_y + step_y <= last_y)
+                keys.append(self._key(first_x[covered] + step_x, first_y[covered] + step_y))
+                items.append(indices[covered])
+        keys = np.concatenate(keys)
+        # Items of a bucket are next to each other, so they are found by binary search
+        order = np.argsort(keys, kind="stable")
+        self.batches[tag] = (keys[order], np.concatenate(items)[order], left, top, right, bottom)
+
+    def remove(self, item):
+        """Remove item (not one inserted in bulk, they are removed by inserting their tag again)"""
+        range_x, range_y = self._cells(self.rects.pop(item))
+        for cell_x in range_x:
+            for cell_y in range_y:
+                cell = self.cells[(cell_x, cell_y)]
+                cell.discard(item)
+                # Free empty buckets
+                if not cell:
+                    del self.cells[(cell_x, cell_y)]
+
+    def query_rect(self, rect, tags=None):
+        """Return set of items overlapping rectangle, only the bulk ones with given tags (all by default)"""
+        rect = pygame.Rect(rect)
+        found = set()
+        range_x, range_y = self._cells(rect)
+        for cell_x in range_x:
+            for cell_y in range_y:
+                cell = self.cells.get((cell_x, cell_y))
+                if cell:
+                    found.update(cell)
+        # Drop items that share bucket, but not the area
+        found = {item for item in found if self.rects[item].colliderect(rect)}
+
+        # Empty rectangles don't overlap anything
+        for tag in self.batches if tags is None else tags:
+            keys, items, left, top, right, bottom = self.batches.get(tag, (None,) * 6)
+            if keys is None or not len(keys) or not rect.width or not rect.height:
+                continue
+            # Items in the buckets, found for all buckets at once
+            wanted = np.array([self._key(cell_x, cell_y) for cell_x in range_x for cell_y in range_y], np.int64)
+            starts, ends = np.searchsorted(keys, wanted), np.searchsorted(keys, wanted, "right")
+            near = [items[start:end] for start, end in zip(starts.tolist(), ends.tolist()) if start < end]
+            if not near:
+                continue
+            near = np.unique(np.concatenate(near))
+            # Drop the ones that share bucket, but not the area
+            near = near[(left[near] < rect.right) & (right[near] > rect.left) &
+                        (top[near] < rect.bottom) & (bottom[near] > rect.top)]
+            found.update((tag, index) for index in near.tolist())
+        return found
+
+    def query_radius(self, pos, radius, tags=None):
+        """Return set of items whose rectangles are within radius of point"""
+        left, top = math.floor(pos[0] - radius), math.floor(pos[1] - radius)
+        found = self.query_rect((left, top, math.floor(pos[0] + radius) + 1 - left,
+                                 math.floor(pos[1] + radius) + 1 - top), tags)
+
+        # Keep the items with the closest pixel of their rectangle close enough
+        near = set()
+        for item in found:
+            item_left, item_top, item_right, item_bottom = self.bounds(item)
+            distance_x = max(item_left - pos[0], 0, pos[0] - item_right + 1)
+            distance_y = max(item_top - pos[1], 0, pos[1] - item_bottom + 1)
+            if distance_x ** 2 + distance_y ** 2 <= radius ** 2:
+                near.add(item)
+        return near
+
+    def query_point(self, pos, tags=None):
+        """Return set of items containing point"""
+        cell_x, cell_y = math.floor(pos[0] / self.cell_size), math.floor(pos[1] / self.cell_size)
+        cell = self.cells.get((cell_x, cell_y))
+        found = {item for item in cell if self.rects[item].collidepoint(pos)} if cell else set()
+
+        # Points are truncated like in rectangles
+        point_x, point_y = int(pos[0]), int(pos[1])
+        for tag in self.batches if tags is None else tags:
+            keys, items, left, top, right, bottom = self.batches.get(tag, (None,) * 6)
+            if keys is None:
+                continue
+            key = self._key(cell_x, cell_y)
+            near = items[np.searchsorted(keys, key):np.searchsorted(keys, key, "right")]
+            near = near[(left[near] <= point_x) & (right[near] > point_x) &
+                        (top[near] <= point_y) & (bottom[near] > point_y)]
+            found.update((tag, index) for index in near.tolist())
+        return found
+
+    def bounds(self, item):
+        """Return bounds of the item's rectangle (left, top, right, bottom)"""
+        if item in self.rects:
+            rect = self.rects[item]
+            return rect.left, rect.top, rect.right, rect.bottom
+        tag, index = item
+        keys, items, left, top, right, bottom = self.batches[tag]
+        return int(left[index]), int(top[index]), int(right[index]), int(bottom[index])
+
+    def __len__(self):
+        """Return amount of items"""
+        return len(self.rects) + sum(len(batch[2]) for batch in self.batches.values())
+
+    def clear(self):
+        """Remove all items"""
+        self.cells.clear()
+        self.rects.clear()
+        self.batches.clear()
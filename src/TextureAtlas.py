@@ -0,0 +1,96 @@
+import os
+import re
+import json
+
+import pygame
+
+
+class TextureAtlas:
+    """Packs directories of images into atlases cached on the disk, hands out frames as subsurfaces"""
+    def __init__(self, image_path, cache_path, max_width=512):
+        """Initialize the texture atlas"""
+        # Directory with the source images
+        self.image_path = image_path
+        # Directory with the cached atlases and their frame tables
+        self.cache_path = cache_path
+        # Maximal width of an atlas, frames continue on the next row
+        self.max_width = max_width
+        # Frames of the already loaded directories
+        self.groups = {}
+
+    @staticmethod
+    def frame_key(name):
+        """Return key to sort frame files numerically (2.png before 10.png)"""
+        return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+    def load(self, directory):
+        """Return frames of the directory in numeric order"""
+        directory = directory.strip("/")
+        if directory in self.groups:
+            return self.groups[directory]
+
+        # Source images and their modification times, the cache is valid only for the same ones
+        source_path = os.path.join(self.image_path, directory)
+        names = sorted(os.listdir(source_path), key=self.frame_key)
+        sources = {name: os.stat(os.path.join(source_path, name)).st_mtime_ns for name in names}
+
+        # Load the cached atlas, or pack a new one if it is missing or outdated
+        cache_name = os.path.join(self.cache_path, directory.replace("/", "_"))
+        cached = self._load_cache(cache_name, sources)
+        if cached:
+            atlas, frames = cached
+        else:
+            atlas, frames = self._pack(source_path, names)
+            self._save_cache(cache_name, sources, atlas, frames)
+
+        # Frames share the pixels of the atlas
+        atlas = atlas.convert_alpha()
+        self.groups[directory] = [atlas.subsurface(frame) for frame in frames]
+        return self.groups[directory]
+
+    def _pack(self, source_path, names):
+        """Pack the images into rows of one atlas, return it with rects of the frames"""
+        images = [pygame.image.load(os.path.join(source_path, name)) for name in names]
+
+        # Place the images left to right, start a new row when it would be too wide
+        frames = []
+        x = y = width = row_height = 0
+        for image in images:
+            if x and x + image.get_width() > self.max_width:
+                x = 0
+                y += row_height
+                row_height = 0
+            frames.append((x, y, image.get_width(), image.get_height()))
+            x += image.get_width()
+            width = max(width, x)
+            row_height = max(row_height, image.get_height())
+
+        # Copy the images to the transparent atlas without blending their alpha
+        atlas = pygame.Surface((max(width, 1), max(y + row_height, 1)), pygame.SRCALPHA)
+        for image, frame in zip(images, frames):
+            atlas.blit(image, frame[:2], special_flags=pygame.BLEND_RGBA_MAX)
+        return atlas, frames
+
+    @staticmethod
+    def _load_cache(cache_name, sources):
+        """Return the cached atlas and its frames, None if the cache doesn't match the sources"""
+        try:
+            with open(cache_name + ".json") as table_file:
+                table = json.load(table_file)
+            if table["sources"] != sources:
+                return None
+            return pygame.image.load(cache_name + ".png"), [tuple(frame) for frame in table["frames"]]
+        # Missing or broken cache is packed again
+        except (OSError, ValueError, KeyError, pygame.error):
+            return None
+
+    def _save_cache(self, cache_name, sources, atlas, frames):
+        """Save the atlas with its frame table, skip it if the cache can't be written"""
+        try:
+            os.makedirs(self.cache_path, exist_ok=True)
+            pygame.image.save(atlas, cache_name + ".png")
+            # Frame table is written last, so it never points to an unfinished atlas
+            with open(cache_name + ".json", "w") as table_file:
+                json.dump({"sources": sources, "frames": frames}, table_file)
+        except (OSError, pygame.error):
+            pass
@@ -0,0 +1,319 @@
+from collections.abc import MutableMapping
+
+import numpy as np
+
+
+class TileChunk:
+    """Dense square chunk of grid tiles"""
+    __slots__ = ("types", "variants", "solid", "neighbours", "count")
+
+    def __init__(self, size):
+        """Initialize empty chunk"""
+        # Type ids of tiles, 0 means there is no tile
+        self.types = bytearray(size * size)
+        # Variants of tiles
+        self.variants = bytearray(size * size)
+        # Solid (physics affected) tiles mask
+        self.solid = bytearray(size * size)
+        # Masks of the neighbouring cells with tiles, one bit per neighbour
+        self.neighbours = bytearray(size * size)
+        # Amount of tiles in the chunk
+        self.count = 0
+
+
+class TileGrid:
+    """Grid tiles stored in dense chunks indexed by integers"""
+    # Offsets of the neighbours in the neighbour masks, from the lowest bit
+    NEIGHBOURS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+    def __init__(self, solid_types, chunk_size=16):
+        """Initialize the grid"""
+        # Types of tiles affected by physics
+        self.solid_types = solid_types
+        # Chunk size in tiles
+        self.chunk_size = chunk_size
+        # Chunks by their (x, y) position
+        self.chunks = {}
+
+        # Tile type names, type id is the index in this list (0 is empty)
+        self.type_names = [None]
+        # Type ids by their names
+        self.type_ids = {}
+
+    def type_id(self, tile_type):
+        """Return id of tile type, register it if it's new"""
+        if tile_type not in self.type_ids:
+            # Type ids have to fit in a byte
+            if len(self.type_names) > 255:
+                raise ValueError("Too many tile types")
+            self.type_ids[tile_type] = len(self.type_names)
+            self.type_names.append(tile_type)
+        return self.type_ids[tile_type]
+
+    def chunk_at(self, pos_x, pos_y):
+        """Return chunk and index in it of grid position (chunk is None if it doesn't exist)"""
+        size = self.chunk_size
+        chunk = self.chunks.get((pos_x // size, pos_y // size))
+        return chunk, (pos_y % size) * size + pos_x % size
+
+    def type_at(self, pos_x, pos_y):
+        """Return type id of a tile at grid position, 0 if there's none"""
+        chunk, index = self.chunk_at(pos_x, pos_y)
+        return chunk.types[index] if chunk else 0
+
+    def is_solid(self, pos_x, pos_y):
+        """Return if tile at grid position is solid"""
+        chunk, index = self.chunk_at(pos_x, pos_y)
+        return bool(chunk and chunk.solid[index])
+
+    def get(self, pos_x, pos_y):
+        """Return (type, variant) of tile at grid position, None if there's none"""
+        chunk, index = self.chunk_at(pos_x, pos_y)
+        if chunk and chunk.types[index]:
+            return self.type_names[chunk.types[index]], chunk.variants[index]
+        return None
+
+    def set(self, pos_x, pos_y, tile_type, variant):
+        """Set a tile at grid position"""
+        if self._put(pos_x, pos_y, tile_type, variant):
+            self._link(pos_x, pos_y, True)
+
+    def _put(self, pos_x, pos_y, tile_type, variant):
+        """Set a tile at grid position without updating the neighbour masks, return if the cell was empty"""
+        type_id = self.type_id(tile_type)
+        size = self.chunk_size
+        key = (pos_x // size, pos_y // size)
+        # Create the chunk if it doesn't exist yet
+        chunk = self.chunks.get(key)
+        if not chunk:
+            chunk = self.chunks[key] = TileChunk(size)
+
+        index = (pos_y % size) * size + pos_x % size
+        # Count the new tile
+        empty = not chunk.types[index]
+        if empty:
+            chunk.count += 1
+        chunk.types[index] = type_id
+        chunk.variants[index] = variant
+        chunk.solid[index] = tile_type in self.solid_types
+        return empty
+
+    def remove(self, pos_x, pos_y):
+        """Remove tile at grid position, return if it existed"""
+        size = self.chunk_size
+        key = (pos_x // size, pos_y // size)
+        chunk = self.chunks.get(key)
+        index = (pos_y % size) * size + pos_x % size
+        if not chunk or not chunk.types[index]:
+            return False
+
+        chunk.types[index] = 0
+        chunk.variants[index] = 0
+        chunk.solid[index] = 0
+        chunk.count -= 1
+        # Free empty chunks
+        if not chunk.count:
+            del self.chunks[key]
+        self._link(pos_x, pos_y, False)
+        return True
+
+    def neighbours_at(self, pos_x, pos_y):
+        """Return neighbour mask of a tile at grid position"""
+        chunk, index = self.chunk_at(pos_x, pos_y)
+        return chunk.neighbours[index] if chunk else 0
+
+    def _link(self, pos_x, pos_y, filled):
+        """Update neighbour masks of the cell and its neighbours after the cell was filled or emptied"""
+        mask = 0
+        for bit, (offset_x, offset_y) in enumerate(self.NEIGHBOURS):
+            chunk, index = self.chunk_at(pos_x + offset_x, pos_y + offset_y)
+            if chunk:
+                # The neighbour sees this cell from the opposite side
+                if filled:
+                    chunk.neighbours[index] |= 1 << (bit ^ 1)
+                else:
+                    chunk.neighbours[index] &= ~(1 << (bit ^ 1))
+                if chunk.types[index]:
+                    mask |= 1 << bit
+        chunk, index = self.chunk_at(pos_x, pos_y)
+        if chunk:
+            chunk.neighbours[index] = mask
+
+    def build_neighbours(self, keys=None):
+        """Calculate neighbour masks of every tile in the chunks (all of them by default) at once"""
+        keys = list(self.chunks) if keys is None else [key for key in keys if key in self.chunks]
+        if not keys:
+            return
+        size = self.chunk_size
+        # Occupancy of the chunks and of their neighbours, the last one is empty for the missing neighbours
+        related = list(dict.fromkeys(keys + [(key[0] + offset_x, key[1] + offset_y) for key in keys
+                                             for offset_x, offset_y in self.NEIGHBOURS
+                                             if (key[0] + offset_x, key[1] + offset_y) in self.chunks]))
+        slabs = {key: slab for slab, key in enumerate(related)}
+        filled = np.frombuffer(b"".join(self.chunks[key].types for key in related) + bytes(size * size),
+                               np.uint8).reshape(len(related) + 1, size, size) != 0
+
+        # Occupancy of the chunks with a border of the cells around them
+        padded = np.zeros((len(keys), size + 2, size + 2), np.bool_)
+        padded[:, 1:-1, 1:-1] = filled[[slabs[key] for key in keys]]
+        # Neighbouring chunks by their offsets
+        around = {offset: [slabs.get((key[0] + offset[0], key[1] + offset[1]), len(related)) for key in keys]
+                  for offset in self.NEIGHBOURS}
+        padded[:, 1:-1, 0] = filled[around[(-1, 0)], :, -1]
+        padded[:, 1:-1, -1] = filled[around[(1, 0)], :, 0]
+        padded[:, 0, 1:-1] = filled[around[(0, -1)], -1, :]
+        padded[:, -1, 1:-1] = filled[around[(0, 1)], 0, :]
+
+        # Set a bit for every neighbour with a tile
+        masks = np.zeros((len(keys), size, size), np.uint8)
+        for bit, (offset_x, offset_y) in enumerate(self.NEIGHBOURS):
+            shifted = padded[:, 1 + offset_y:size + 1 + offset_y, 1 + offset_x:size + 1 + offset_x]
+            masks |= shifted.astype(np.uint8) << bit
+        for key, chunk_masks in zip(keys, masks):
+            self.chunks[key].neighbours[:] = chunk_masks.tobytes()
+
+    def _around(self, key):
+        """Return the chunk and the chunks next to it"""
+        return [key] + [(key[0] + offset_x, key[1] + offset_y) for offset_x, offset_y in self.NEIGHBOURS]
+
+    def tiles(self):
+        """Yield every tile as (x, y, type, variant)"""
+        size = self.chunk_size
+        for (chunk_x, chunk_y), chunk in list(self.chunks.items()):
+            for index, type_id in enumerate(chunk.types):
+                if type_id:
+                    yield (chunk_x * size + index % size, chunk_y * size + index // size,
+                           self.type_names[type_id], chunk.variants[index])
+
+    def __len__(self):
+        """Return amount of tiles"""
+        return sum(chunk.count for chunk in self.chunks.values())
+
+    def clear(self):
+        """Remove all tiles"""
+        self.chunks.clear()
+
+    def load_chunk(self, key, types, variants, type_names):
+        """Replace chunk with type ids (of the type names list) and variants of all its tiles"""
+        # Translate type ids of the source into ids of this grid in one pass
+        ids = bytearray(range(256))
+        for type_id, tile_type in enumerate(type_names):
+            ids[type_id] = self.type_id(tile_type) if tile_type else 0
+        # Solid flags by type id
+        solid = bytearray(256)
+        for type_id, tile_type in enumerate(self.type_names):
+            solid[type_id] = tile_type in self.solid_types
+
+        chunk = TileChunk(self.chunk_size)
+        chunk.types[:] = types.translate(ids)
+        chunk.variants[:] = variants
+        chunk.solid[:] = chunk.types.translate(solid)
+        chunk.count = len(chunk.types) - chunk.types.count(0)
+        if chunk.count:
+            self.chunks[key] = chunk
+        else:
+            self.chunks.pop(key, None)
+        self.build_neighbours(self._around(key))
+
+    def unload_chunk(self, key):
+        """Remove chunk with all its tiles"""
+        self.chunks.pop(key, None)
+        self.build_neighbours(self._around(key))
+
+    def load_arrays(self, pos_x, pos_y, types, variants, type_names):
+        """Load tiles from arrays of grid positions, type ids (of the type names list) and variants"""
+        self.clear()
+        if not len(pos_x):
+            return
+        # Translate type ids of the source into ids of this grid
+        ids = np.array([self.type_id(tile_type) if tile_type else 0 for tile_type in type_names], np.uint8)
+        types = ids[types]
+        solid = np.array([tile_type in self.solid_types for tile_type in self.type_names], np.uint8)[types]
+
+        # Chunks are created in order of their first tiles, like in the JSON format
+        size = self.chunk_size
+        chunk_x, chunk_y = pos_x // size, pos_y // size
+        keys = (chunk_x.astype(np.int64) << 32) | (chunk_y.astype(np.int64) & 0xFFFFFFFF)
+        first, inverse = np.unique(keys, return_index=True, return_inverse=True)[1:]
+        order = np.argsort(first)
+        rank = np.argsort(order)[inverse]
+
+        # Fill all chunks at once, one row per chunk
+        cells = (pos_y % size) * size + pos_x % size
+        area = size * size
+        all_types = np.zeros((len(first), area), np.uint8)
+        all_variants = np.zeros((len(first), area), np.uint8)
+        all_solid = np.zeros((len(first), area), np.uint8)
+        all_types[rank, cells] = types
+        all_variants[rank, cells] = variants
+        all_solid[rank, cells] = solid
+        counts = np.count_nonzero(all_types, 1).tolist()
+
+        for row, index in enumerate(first[order].tolist()):
+            chunk = TileChunk(size)
+            chunk.types[:] = all_types[row].tobytes()
+            chunk.variants[:] = all_variants[row].tobytes()
+            chunk.solid[:] = all_solid[row].tobytes()
+            chunk.count = counts[row]
+            self.chunks[(int(chunk_x[index]), int(chunk_y[index]))] = chunk
+        self.build_neighbours()
+
+    def load_json(self, tile_map):
+        """Load tiles from the JSON level format"""
+        self.clear()
+        for tile in tile_map.values():
+            self._put(int(tile["pos"][0]), int(tile["pos"][1]), tile["type"], tile["variant"])
+        self.build_neighbours()
+
+    def to_json(self):
+        """Return tiles in the JSON level format"""
+        return {str(pos_x) + ';' + str(pos_y): {"type": tile_type, "variant": variant, "pos": [pos_x, pos_y]}
+                for pos_x, pos_y, tile_type, variant in self.tiles()}
+
+
+class TileMapView(MutableMapping):
+    """Dictionary view of the grid tiles in the JSON format, keyed by "x;y" locations"""
+    def __init__(self, tile_map):
+        """Initialize the view"""
+        # Tile map reference, edits go through it to keep caches valid
+        self.tile_map = tile_map
+
+    @staticmethod
+    def _parse(location):
+        """Return grid position from "x;y" location"""
+        pos_x, pos_y = location.split(';')
+        return int(pos_x), int(pos_y)
+
+    def __getitem__(self, location):
+        """Return tile at location as a dictionary"""
+        pos = self._parse(location)
+        tile = self.tile_map.grid.get(*pos)
+        if not tile:
+            raise KeyError(location)
+        return {"type": tile[0], "variant": tile[1], "pos": list(pos)}
+
+    def __setitem__(self, location, tile):
+        """Place tile at location"""
+        self.tile_map.place_tile(self._parse(location), tile["type"], tile["variant"])
+
+    def __delitem__(self, location):
+        """Remove tile at location"""
+        if not self.tile_map.remove_tile(self._parse(location)):
+            raise KeyError(location)
+
+    def __contains__(self, location):
+        """Return if there is a tile at location"""
+        return bool(self.tile_map.grid.type_at(*self._parse(location)))
+
+    def __iter__(self):
+        """Iterate over locations of tiles"""
+        for pos_x, pos_y, tile_type, variant in self.tile_map.grid.tiles():
+            yield str(pos_x) + ';' + str(pos_y)
+
+    def __len__(self):
+        """Return amount of tiles"""
+        return len(self.tile_map.grid)
+
+    def copy(self):
+        """Return tiles as a plain dictionary"""
+        return self.tile_map.grid.to_json()
@@ -1,13 +1,22 @@
 import json
+import math
 
+import numpy as np
 import pygame
 
 from src.Utilities import Utilities
+from src.ChunkCache import ChunkCache
+from src.TileGrid import TileGrid, TileMapView
+from src.SpatialHash import SpatialHash
+from src.SolidityMap import SolidityMap
+from src.RegionFile import RegionFile
+from src.ChunkStreamer import ChunkStreamer
+from src.LevelFile import LevelFile
 
 
 class TileMap:
     """Map of tiles"""
-    def __init__(self, game, size=16):
+    def __init__(self, game, size=16, chunk_size=16, cache_size=64, stream_radius=2):
         """Initialize the map of tiles"""
         # Get game reference
         self.game = game
@@ -16,17 +25,53 @@ class TileMap:
 
         # Title size
         self.size = size
-        # Tile map affected by physics
-        self.tile_map = {}
-        # Tiles not affected by physics
-        self.deco_tile_map = []
+        # Tiles affected by physics, stored in dense chunks
+        self.grid = TileGrid(self.utilities.PHYSICS_TILES, chunk_size)
+        # Their dictionary view in the JSON format
+        self.tile_map = TileMapView(self)
+        # Auto-tiling variants by neighbour masks of the tiles, None where no rule applies
+        self.auto_tile_table = [self.utilities.AUTO_TILE_RULES.get(tuple(sorted(
+            offset for bit, offset in enumerate(TileGrid.NEIGHBOURS) if mask >> bit & 1))) for mask in range(16)]
+        # Auto-tile edited cells and their neighbours while placing and removing tiles
+        self.auto_tiling = False
+        # Bitmap of solid tiles for collision queries
+        self.solidity = SolidityMap()
+        # Tiles not affected by physics by their handles, in placement order
+        self.deco_tiles = {}
+        # Spatial index of their handles, keyed by bounds of their images
+        self.deco_index = SpatialHash(chunk_size * size // 4)
+        # Handles by ids of the tiles
+        self._deco_handles = {}
+        # Next free handle
+        self._next_handle = 0
+        # Edits made since the snapshot or in the editor's stroke, None when nothing is logged
+        # They are (kind, position or handle, previous state, new state), states are None for empty cells
+        self.change_log = None
+
+        # Cache of pre-rendered chunks, turned off when its size is 0
+        self.chunk_cache = ChunkCache(self, chunk_size, cache_size) if cache_size else None
+
+        # Region file of a streamed level and its chunk reader, None when the whole level is loaded
+        self.region = None
+        self.streamer = None
+        # Chunks loaded from the region around the streaming center (chunks)
+        self.stream_radius = stream_radius
+        # Loaded chunks of the region and the ones never evicted (pinned or edited)
+        self.loaded_chunks = set()
+        self.kept_chunks = set()
 
     def draw(self, surface, offset=(0, 0)):
         """Draw the tiles"""
-        # Render tiles not affected by physics (off-grid ones)
-        for tile in self.deco_tile_map:
+        # Draw the pre-rendered chunks if they are cached
+        if self.chunk_cache:
+            self.chunk_cache.draw(surface, offset)
+            return
+
+        # Render visible tiles not affected by physics (off-grid ones)
+        view = (offset[0] - 1, offset[1] - 1, surface.get_width() + 2, surface.get_height() + 2)
+        for tile in self.query_rect(view):
             surface.blit(self.game.assets[tile["type"]][tile["variant"]],
-                         (tile["pos"][0] - offset[0], tile["pos"][1] - offset[1]))
+                         (math.floor(tile["pos"][0]) - offset[0], math.floor(tile["pos"][1]) - offset[1]))
 
         # Calculate the position of the first visible tile and last one horizontally
         range_x = (int(offset[0] // self.size),
@@ -38,116 +83,482 @@ class TileMap:
         # Render tiles affected by physics, only the visible ones (grid)
         for pos_x in range(range_x[0], range_x[1]):
             for pos_y in range(range_y[0], range_y[1]):
-                location = str(pos_x) + ';' + str(pos_y)
+                tile = self.grid.get(pos_x, pos_y)
                 # If the tile exists, draw it
-                if location in self.tile_map:
-                    tile = self.tile_map[location]
-                    surface.blit(self.game.assets[tile["type"]][tile["variant"]],
-                                 (tile["pos"][0] * self.size - offset[0],
-                                  tile["pos"][1] * self.size - offset[1]))
-
-    def _get_tiles_near(self, pos):
-        """Return tiles near the given position"""
-        tiles = []
-        # Get tile location in grid
-        tile_location = (int(pos[0] // self.size), int(pos[1] // self.size))
-        # Look for every near offset possible
-        for offset in self.utilities.NEAR_OFFSETS:
-            # Change location to the JSON grid format, add offset to it
-            location = (str(tile_location[0] + offset[0]) + ';' +
-                        str(tile_location[1] + offset[1]))
-            # If the location is pointing to a tile, append it to the list
-            if location in self.tile_map:
-                tiles.append(self.tile_map[location])
-        return tiles
-
-    def physics_tiles_near(self, pos):
-        """Return near physics tiles as rectangles"""
-        tiles = []
-        # Search for every tile near
-        for tile in self._get_tiles_near(pos):
-            # If it is a physic tiles, convert it to a rectangle and append to the list
-            if tile["type"] in self.utilities.PHYSICS_TILES:
-                tiles.append(pygame.Rect(tile["pos"][0] * self.size,
-                                         tile["pos"][1] * self.size,
-                                         self.size, self.size))
-        return tiles
+                if tile:
+                    surface.blit(self.game.assets[tile[0]][tile[1]],
+                                 (pos_x * self.size - offset[0], pos_y * self.size - offset[1]))
+
+    def solid_tiles_in(self, left, top, right, bottom):
+        """Return grid positions of physics tiles overlapping the area (pixels, right and bottom excluded)"""
+        return self.solidity.cells_in(left // self.size, top // self.size,
+                                      (right - 1) // self.size, (bottom - 1) // self.size)
+
+    def place_tile(self, pos, tile_type, variant):
+        """Place a tile on the grid"""
+        self._keep_chunk(pos)
+        # Don't do anything if the same tile is already there
+        previous = self.grid.get(pos[0], pos[1])
+        if previous == (tile_type, variant):
+            return
+        self._log(("tile", pos, previous, (tile_type, variant)))
+        self.grid.set(pos[0], pos[1], tile_type, variant)
+        self.solidity.set(pos[0], pos[1], tile_type in self.grid.solid_types)
+        self._invalidate_tile(pos)
+        # New tile changes its neighbours too, a replaced one only itself
+        if self.auto_tiling:
+            if previous:
+                self._auto_tile_at(pos[0], pos[1])
+            else:
+                self._auto_tile_around(pos)
+
+    def remove_tile(self, pos):
+        """Remove a tile from the grid, return if it existed"""
+        self._keep_chunk(pos)
+        previous = self.grid.get(pos[0], pos[1])
+        if self.grid.remove(pos[0], pos[1]):
+            self._log(("tile", pos, previous, None))
+            self.solidity.set(pos[0], pos[1], False)
+            self._invalidate_tile(pos)
+            if self.auto_tiling:
+                self._auto_tile_around(pos)
+            return True
+        return False
+
+    @property
+    def deco_tile_map(self):
+        """Return list of tiles not affected by physics, in placement order"""
+        return list(self.deco_tiles.values())
+
+    def place_deco(self, tile):
+        """Place an off-grid tile"""
+        handle = self._next_handle
+        self._next_handle += 1
+        self._log(("deco", handle, None, tile))
+        self._insert_deco(handle, tile)
+
+    def _insert_deco(self, handle, tile):
+        """Add an off-grid tile with given handle"""
+        self.deco_tiles[handle] = tile
+        self._deco_handles[id(tile)] = handle
+        self.deco_index.insert(handle, self.deco_rect(tile))
+        self._invalidate_deco(tile)
+
+    def remove_deco(self, tile):
+        """Remove an off-grid tile"""
+        handle = self._deco_handles.pop(id(tile))
+        self._log(("deco", handle, tile, None))
+        del self.deco_tiles[handle]
+        self.deco_index.remove(handle)
+        self._invalidate_deco(tile)
+
+    def snapshot(self):
+        """Remember the current state of the map, edits from now on are logged so it can be restored"""
+        self.change_log = []
+
+    def restore(self):
+        """Undo the edits made since the snapshot"""
+        if self.change_log:
+            self.undo(self.change_log)
+            self.change_log = []
+
+    def undo(self, changes):
+        """Undo logged edits, in reverse order"""
+        self._apply(reversed(changes), True)
+
+    def redo(self, changes):
+        """Make undone edits again"""
+        self._apply(changes, False)
+
+    def _apply(self, changes, undo):
+        """Put logged edits into their previous or new states"""
+        # Applying doesn't log or auto-tile anything, the log has the auto-tiled variants too
+        change_log, auto_tiling = self.change_log, self.auto_tiling
+        self.change_log, self.auto_tiling = None, False
+        restored_decos = False
+        for kind, key, previous, current in changes:
+            state = previous if undo else current
+            if kind == "tile":
+                if state:
+                    self.place_tile(key, state[0], state[1])
+                else:
+                    self.remove_tile(key)
+            elif state:
+                # Off-grid tile gets its old handle back, so it keeps its place in the placement order
+                self._insert_deco(key, state)
+                restored_decos = True
+            else:
+                self.remove_deco(self.deco_tiles[key])
+        if restored_decos:
+            self.deco_tiles = dict(sorted(self.deco_tiles.items()))
+        self.change_log, self.auto_tiling = change_log, auto_tiling
+
+    def apply_tiles(self, tiles):
+        """Place tiles given by their grid positions as one batch (None removes them), return changed positions"""
+        changed = []
+        for pos, tile in tiles.items():
+            self._keep_chunk(pos)
+            previous = self.grid.get(pos[0], pos[1])
+            if previous == tile:
+                continue
+            self._log(("tile", pos, previous, tile))
+            if tile:
+                self.grid.set(pos[0], pos[1], tile[0], tile[1])
+                self.solidity.set(pos[0], pos[1], tile[0] in self.grid.solid_types)
+            else:
+                self.grid.remove(pos[0], pos[1])
+                self.solidity.set(pos[0], pos[1], False)
+            changed.append(pos)
+
+        # Auto-tile every changed cell and its neighbours once, their masks are final already
+        if self.auto_tiling:
+            self.auto_tiling = False
+            around = set(changed)
+            around.update((pos[0] + offset_x, pos[1] + offset_y) for pos in changed
+                          for offset_x, offset_y in TileGrid.NEIGHBOURS)
+            for pos in around:
+                self._auto_tile_at(pos[0], pos[1])
+            self.auto_tiling = True
+
+        # Invalidate every changed chunk once
+        if self.chunk_cache:
+            for key in {(pos[0] // self.grid.chunk_size, pos[1] // self.grid.chunk_size) for pos in changed}:
+                self.chunk_cache.invalidate_chunk(key)
+        return changed
+
+    def fill_rect(self, left, top, right, bottom, tile):
+        """Fill grid positions in the inclusive range with the tile (None clears them), return changed positions"""
+        return self.apply_tiles({(pos_x, pos_y): tile for pos_x in range(left, right + 1)
+                                 for pos_y in range(top, bottom + 1)})
+
+    def flood_fill(self, pos, tile, bounds):
+        """Fill cells connected to the grid position with its tile type inside bounds, return changed positions"""
+        # Inclusive range of grid positions
+        left, top, right, bottom = bounds
+        if not (left <= pos[0] <= right and top <= pos[1] <= bottom):
+            return []
+        target = self.grid.type_at(pos[0], pos[1])
+        # Walk through the connected cells
+        cells = {pos: tile}
+        stack = [pos]
+        while stack:
+            pos_x, pos_y = stack.pop()
+            for offset_x, offset_y in TileGrid.NEIGHBOURS:
+                near = (pos_x + offset_x, pos_y + offset_y)
+                if (near not in cells and left <= near[0] <= right and top <= near[1] <= bottom
+                        and self.grid.type_at(near[0], near[1]) == target):
+                    cells[near] = tile
+                    stack.append(near)
+        return self.apply_tiles(cells)
+
+    def copy_region(self, left, top, right, bottom):
+        """Return grid and off-grid tiles in the inclusive range of grid positions, relative to its top left"""
+        tiles = {}
+        for pos_x in range(left, right + 1):
+            for pos_y in range(top, bottom + 1):
+                tile = self.grid.get(pos_x, pos_y)
+                if tile:
+                    tiles[(pos_x - left, pos_y - top)] = tile
+        # Off-grid tiles starting in the range, their positions relative to it in pixels
+        area = pygame.Rect(left * self.size, top * self.size, (right - left + 1) * self.size,
+                           (bottom - top + 1) * self.size)
+        decos = [{"type": tile["type"], "variant": tile["variant"],
+                  "pos": [tile["pos"][0] - area.left, tile["pos"][1] - area.top]}
+                 for tile in self.query_rect(area) if area.collidepoint(tile["pos"])]
+        return {"tiles": tiles, "off_grid": decos}
+
+    def paste_region(self, region, pos):
+        """Place copied region with its top left at grid position, empty cells of it are kept"""
+        self.apply_tiles({(pos[0] + offset_x, pos[1] + offset_y): tile
+                          for (offset_x, offset_y), tile in region["tiles"].items()})
+        for tile in region["off_grid"]:
+            self.place_deco({"type": tile["type"], "variant": tile["variant"],
+                             "pos": [pos[0] * self.size + tile["pos"][0], pos[1] * self.size + tile["pos"][1]]})
+
+    def _log(self, change):
+        """Log an edit, if there's a snapshot to restore"""
+        if self.change_log is not None:
+            self.change_log.append(change)
+
+    def query_rect(self, rect):
+        """Return off-grid tiles overlapping rectangle (pixels), in placement order"""
+        return [self.deco_tiles[handle] for handle in sorted(self.deco_index.query_rect(rect))]
+
+    def query_point(self, pos):
+        """Return off-grid tiles containing point (pixels), in placement order"""
+        return [self.deco_tiles[handle] for handle in sorted(self.deco_index.query_point(pos))]
+
+    def deco_rect(self, tile):
+        """Return rectangle of an off-grid tile in the world"""
+        # Positions are floored like when the tile is drawn, rectangles would truncate negative ones the other way
+        left, top = math.floor(tile["pos"][0]), math.floor(tile["pos"][1])
+        # Tiles without loaded images (like spawners in the game) take one grid cell
+        if tile["type"] not in self.game.assets:
+            return pygame.Rect(left, top, self.size, self.size)
+        image = self.game.assets[tile["type"]][tile["variant"]]
+        return pygame.Rect(left, top, image.get_width(), image.get_height())
+
+    def _invalidate_tile(self, pos):
+        """Invalidate cached render of a grid tile"""
+        if self.chunk_cache:
+            self.chunk_cache.invalidate_tile(pos)
+
+    def _invalidate_deco(self, tile):
+        """Invalidate cached render of an off-grid tile"""
+        if self.chunk_cache:
+            self.chunk_cache.invalidate_rect(self.deco_rect(tile))
+
+    def _keep_chunk(self, pos):
+        """Load streamed chunk containing grid position before it's edited and never evict it"""
+        if not self.region:
+            return
+        key = (pos[0] // self.grid.chunk_size, pos[1] // self.grid.chunk_size)
+        if key in self.region.index and key not in self.loaded_chunks:
+            self.streamer.request(key)
+            self._install_chunks(self.streamer.finished(True))
+        self.kept_chunks.add(key)
 
     def save(self, path):
         """Save all changes to a given file"""
-        # Open file in write mode
-        with open(path, "w") as file:
-            # Dump the tile map variables in JSON format
-            json.dump(
-                {"tile_map": self.tile_map, "tile_size": self.size, "off_grid": self.deco_tile_map}, file)
+        # Streamed levels are saved whole
+        if self.region:
+            self.stream_all()
+        data = {"tile_map": self.grid.to_json(), "tile_size": self.size, "off_grid": self.deco_tile_map}
+        # Keep the format of converted levels
+        if path.endswith(".level"):
+            LevelFile.write(path, data)
+        elif path.endswith(".region"):
+            RegionFile.write(path, data, self.grid.chunk_size)
+        else:
+            # Open file in write mode
+            with open(path, "w") as file:
+                # Dump the tile map variables in JSON format
+                json.dump(data, file)
 
     def load(self, path):
-        """Load changes from a given file"""
+        """Load changes from a given file (JSON, binary or region one), levels in region files are streamed"""
+        self._stop_streaming()
+        # Snapshot of the previous map can't be restored anymore
+        self.change_log = None
+        if RegionFile.is_region(path):
+            self._load_region(path)
+            return
+        if LevelFile.is_level(path):
+            self._load_binary(path)
+            return
+
         # Open file in read mode
         with open(path, "r") as file:
             # Save the data from JSON format
             data = json.load(file)
         # Save all information
-        self.tile_map = data["tile_map"]
         self.size = data["tile_size"]
-        self.deco_tile_map = data["off_grid"]
+        self.grid.load_json(data["tile_map"])
+        self.solidity.build(self.grid)
+        self._load_decos(data["off_grid"])
+
+        # Forget everything rendered from the previous map
+        if self.chunk_cache:
+            self.chunk_cache.clear()
+
+    def _load_decos(self, tiles):
+        """Replace the off-grid tiles"""
+        self.deco_tiles.clear()
+        self.deco_index.clear()
+        self._deco_handles.clear()
+        for tile in tiles:
+            self.place_deco(tile)
+
+    def _load_binary(self, path):
+        """Load level from a binary level file, straight from its arrays"""
+        level = LevelFile(path)
+        try:
+            self.size = level.tile_size
+            self.grid.load_arrays(level.pos_x, level.pos_y, level.types, level.variants, level.type_names)
+            # Positions of the solid tiles
+            solid = np.isin(level.types, [type_id for type_id, tile_type in enumerate(level.type_names)
+                                          if tile_type in self.grid.solid_types])
+            self.solidity.build_arrays(level.pos_x[solid], level.pos_y[solid])
+            self._load_decos(level.off_grid)
+        finally:
+            level.close()
+
+        if self.chunk_cache:
+            self.chunk_cache.clear()
+
+    def _load_region(self, path):
+        """Start streaming level from a region file, load only its header and pinned chunks"""
+        region = RegionFile(path)
+        # Chunks are copied whole into the grid
+        if region.chunk_size != self.grid.chunk_size:
+            region.close()
+            raise ValueError("Region file has chunk size " + str(region.chunk_size) + ", the map uses "
+                             + str(self.grid.chunk_size))
+        self.region = region
+        self.streamer = ChunkStreamer(region)
+        self.size = region.tile_size
+        self.grid.clear()
+        self.solidity.clear()
+        # Chunks that aren't loaded yet are solid, so nothing falls through them
+        cells = b"\x01" * (region.chunk_size * region.chunk_size)
+        for chunk_x, chunk_y in region.index:
+            self.solidity.fill(chunk_x * region.chunk_size, chunk_y * region.chunk_size, region.chunk_size, cells)
+        self._load_decos(region.off_grid)
+        if self.chunk_cache:
+            self.chunk_cache.clear()
+
+        # Chunks with the tiles needed at the start (spawners) stay loaded
+        self.kept_chunks.update(region.pinned)
+        for key in region.pinned:
+            self.streamer.request(key)
+        self._install_chunks(self.streamer.finished(True))
+
+    def stream(self, center, wait=False):
+        """Load chunks of the region around the position (pixels) in the background, evict the far ones"""
+        if not self.region:
+            return
+        # Chunk of the center
+        size = self.grid.chunk_size * self.size
+        center_x, center_y = math.floor(center[0] / size), math.floor(center[1] / size)
+
+        # Ask for the missing chunks in the radius
+        for chunk_x in range(center_x - self.stream_radius, center_x + self.stream_radius + 1):
+            for chunk_y in range(center_y - self.stream_radius, center_y + self.stream_radius + 1):
+                if (chunk_x, chunk_y) in self.region.index and (chunk_x, chunk_y) not in self.loaded_chunks:
+                    self.streamer.request((chunk_x, chunk_y))
+        self._install_chunks(self.streamer.finished(wait))
+
+        # Evict chunks a chunk past the radius, so moving along its edge doesn't reload them all the time
+        for key in list(self.loaded_chunks - self.kept_chunks):
+            if max(abs(key[0] - center_x), abs(key[1] - center_y)) > self.stream_radius + 1:
+                self._evict_chunk(key)
+
+    def stream_all(self):
+        """Load every chunk of the region and keep them"""
+        for key in self.region.index:
+            if key not in self.loaded_chunks:
+                self.streamer.request(key)
+        self._install_chunks(self.streamer.finished(True))
+        self.kept_chunks.update(self.region.index)
+
+    def _install_chunks(self, chunks):
+        """Put chunks read by the streamer into the grid"""
+        size = self.grid.chunk_size
+        for key, (types, variants) in chunks:
+            # Chunk may have been loaded already and edited since then
+            if key in self.loaded_chunks:
+                continue
+            self.grid.load_chunk(key, types, variants, self.region.type_names)
+            chunk = self.grid.chunks.get(key)
+            self.solidity.fill(key[0] * size, key[1] * size, size, chunk.solid if chunk else bytes(size * size))
+            self.loaded_chunks.add(key)
+            if self.chunk_cache:
+                self.chunk_cache.invalidate_chunk(key)
+
+    def _evict_chunk(self, key):
+        """Remove chunk loaded from the region, it's solid again until reloaded"""
+        size = self.grid.chunk_size
+        self.grid.unload_chunk(key)
+        self.solidity.fill(key[0] * size, key[1] * size, size, b"\x01" * (size * size))
+        self.loaded_chunks.discard(key)
+        if self.chunk_cache:
+            self.chunk_cache.invalidate_chunk(key)
+
+    def area_loaded(self, rect):
+        """Return if the chunks under the rectangle (pixels) and a tile around it are loaded or don't need to be"""
+        if not self.region:
+            return True
+        size = self.grid.chunk_size * self.size
+        # Chunks overlapped by the rectangle grown by a tile, entities check the tiles just next to them
+        left, top = math.floor((rect[0] - self.size) / size), math.floor((rect[1] - self.size) / size)
+        right = math.floor((rect[0] + rect[2] + self.size) / size)
+        bottom = math.floor((rect[1] + rect[3] + self.size) / size)
+        for chunk_x in range(left, right + 1):
+            for chunk_y in range(top, bottom + 1):
+                if (chunk_x, chunk_y) in self.region.index and (chunk_x, chunk_y) not in self.loaded_chunks:
+                    return False
+        return True
+
+    def points_loaded(self, pos_x, pos_y):
+        """Return if the chunks under the positions in the arrays (pixels) are loaded or don't need to be"""
+        loaded = np.ones(len(pos_x), np.bool_)
+        if not self.region or not len(pos_x):
+            return loaded
+        size = self.grid.chunk_size * self.size
+        chunks = np.stack((np.floor_divide(pos_x, size), np.floor_divide(pos_y, size)), 1).astype(np.int64)
+        # Look up every distinct chunk once
+        keys, inverse = np.unique(chunks, axis=0, return_inverse=True)
+        missing = np.array([key in self.region.index and key not in self.loaded_chunks
+                            for key in map(tuple, keys.tolist())], np.bool_)
+        loaded[missing[inverse.ravel()]] = False
+        return loaded
+
+    def _stop_streaming(self):
+        """Stop streaming the previous level"""
+        if self.streamer:
+            self.streamer.stop()
+        self.region = None
+        self.streamer = None
+        self.loaded_chunks.clear()
+        self.kept_chunks.clear()
 
     def auto_tile(self):
-        """Change variants depending on the placement automatically"""
-        # Go through each tile location in map
-        for location in self.tile_map:
-            # Get the tile based of location
-            tile = self.tile_map[location]
-            near_tiles = set()
-            # Go through each near tile
-            for near in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                # Calculate the near tile location in JSON format
-                near_location = str(tile["pos"][0] + near[0]) + ';' + str(tile["pos"][1] + near[1])
-                # If there is a tile and not just empty space, add it to the near tiles set
-                if near_location in self.tile_map:
-                    near_tiles.add(near)
-            # Sort them for auto tile rules checking
-            near_tiles = tuple(sorted(near_tiles))
-            # If this group of tiles is affected by auto-tiling and a rule applies, change its variant
-            if (tile["type"] in self.utilities.AUTO_TILE_TILES) and (near_tiles
-                                                                     in self.utilities.AUTO_TILE_RULES):
-                tile["variant"] = self.utilities.AUTO_TILE_RULES[near_tiles]
+        """Change variants of every tile depending on the placement automatically (after bulk imports)"""
+        size = self.grid.chunk_size
+        # Type ids of the tiles affected by auto-tiling
+        auto_tile_ids = {self.grid.type_ids[tile_type] for tile_type in self.utilities.AUTO_TILE_TILES
+                         if tile_type in self.grid.type_ids}
+        for (chunk_x, chunk_y), chunk in list(self.grid.chunks.items()):
+            for index, type_id in enumerate(chunk.types):
+                if type_id in auto_tile_ids:
+                    # If a rule applies, change the variant
+                    variant = self.auto_tile_table[chunk.neighbours[index]]
+                    if variant is not None and variant != chunk.variants[index]:
+                        self.place_tile((chunk_x * size + index % size, chunk_y * size + index // size),
+                                        self.grid.type_names[type_id], variant)
+
+    def _auto_tile_around(self, pos):
+        """Change variants of the tile at grid position and its neighbours"""
+        self._auto_tile_at(pos[0], pos[1])
+        for offset_x, offset_y in TileGrid.NEIGHBOURS:
+            self._auto_tile_at(pos[0] + offset_x, pos[1] + offset_y)
+
+    def _auto_tile_at(self, pos_x, pos_y):
+        """Change variant of the tile at grid position depending on its neighbours"""
+        chunk, index = self.grid.chunk_at(pos_x, pos_y)
+        if not chunk or not chunk.types[index]:
+            return
+        tile_type = self.grid.type_names[chunk.types[index]]
+        variant = self.auto_tile_table[chunk.neighbours[index]]
+        # If this group of tiles is affected by auto-tiling and a rule applies, change its variant
+        if tile_type in self.utilities.AUTO_TILE_TILES and variant is not None:
+            self.place_tile((pos_x, pos_y), tile_type, variant)
 
     def extract(self, id_pairs, keep=False):
         """Get all tiles from given pairs, remove them if needed"""
         matches = []
         # Go through each off-grid tile
-        for tile in self.deco_tile_map.copy():
+        for tile in self.deco_tile_map:
             # If tile is in pair, append it to the list
             if (tile["type"], tile["variant"]) in id_pairs:
                 matches.append(tile.copy())
                 # If it isn't needed, remove it
                 if not keep:
-                    self.deco_tile_map.remove(tile)
+                    self.remove_deco(tile)
 
         # Go through each grid tile
-        for location in self.tile_map.copy():
-            tile = self.tile_map[location]
-            # If tile is in pair, append it to the list
-            if (tile["type"], tile["variant"]) in id_pairs:
-                # Get the copy
-                matches.append(tile.copy())
-                matches[-1]["pos"] = matches[-1]["pos"].copy()
-                # Convert size to pixels
-                matches[-1]["pos"][0] *= self.size
-                matches[-1]["pos"][1] *= self.size
+        for pos_x, pos_y, tile_type, variant in self.grid.tiles():
+            # If tile is in pair, append it to the list with position converted to pixels
+            if (tile_type, variant) in id_pairs:
+                matches.append({"type": tile_type, "variant": variant,
+                                "pos": [pos_x * self.size, pos_y * self.size]})
                 # If it isn't needed anymore remove it
                 if not keep:
-                    del self.tile_map[location]
+                    self.remove_tile((pos_x, pos_y))
 
         return matches
 
     def solid_check(self, pos):
         """Return if the position is a solid tile"""
-        # Turn the position into JSON location
-        tile_location = str(int(pos[0] // self.size)) + ';' + str(int(pos[1] // self.size))
-        # If this tile in the tile map
-        if tile_location in self.tile_map:
-            # If it's solid (physics affected tile), return it
-            if self.tile_map[tile_location]["type"] in self.utilities.PHYSICS_TILES:
-                return self.tile_map[tile_location]
+        # Check if the grid tile under the position is solid (physics affected tile)
+        return bool(self.solidity.get(int(pos[0] // self.size), int(pos[1] // self.size)))
@@ -0,0 +1,58 @@
+import pygame
+
+
+class Transition:
+    """Level transition frames, rendered once and reused"""
+    # Shapes of the hole the level is seen through
+    SHAPES = ("circle", "diamond", "square")
+    # Color of the hole, made invisible by the color key
+    HOLE_COLOR = (255, 255, 255)
+
+    def __init__(self, size, shape="circle", length=30, scale=8, color=(0, 0, 0)):
+        """Initialize the transition"""
+        if shape not in self.SHAPES:
+            raise ValueError(f"Unknown transition shape: {shape}")
+        # Size of the frames
+        self.size = size
+        # Shape of the hole
+        self.shape = shape
+        # Number of steps of the transition, the hole shrinks by scale every step
+        self.length = length
+        self.scale = scale
+        # Color covering the level
+        self.color = color
+
+        # Frame of every step, rendered the first time it is needed
+        self.frames = [None] * (length + 1)
+
+    def draw(self, surface, value):
+        """Draw the transition frame for the value (0 is no transition, length is fully covered)"""
+        if not value:
+            return
+        step = min(abs(value), self.length)
+        if self.frames[step] is None:
+            self.frames[step] = self._render((self.length - step) * self.scale)
+        surface.blit(self.frames[step], (0, 0))
+
+    def _render(self, radius):
+        """Render frame with hole of the radius"""
+        surface = pygame.Surface(self.size)
+        surface.fill(self.color)
+        center = (self.size[0] // 2, self.size[1] // 2)
+
+        # Cut the hole of the shape
+        if radius:
+            if self.shape == "circle":
+                pygame.draw.circle(surface, self.HOLE_COLOR, center, radius)
+            elif self.shape == "diamond":
+                pygame.draw.polygon(surface, self.HOLE_COLOR, [(center[0], center[1] - radius),
+                                                               (center[0] + radius, center[1]),
+                                                               (center[0], center[1] + radius),
+                                                               (center[0] - radius, center[1])])
+            else:
+                pygame.draw.rect(surface, self.HOLE_COLOR, (center[0] - radius, center[1] - radius,
+                                                            radius * 2, radius * 2))
+
+        # Make the hole invisible
+        surface.set_colorkey(self.HOLE_COLOR)
+        return surface
@@ -2,6 +2,8 @@ import os
 
 import pygame
 
+from src.TextureAtlas import TextureAtlas
+
 
 class Utilities:
     """Utilities for the game"""
@@ -10,15 +12,16 @@ class Utilities:
         self.BASE_PATH = os.path.dirname(os.path.abspath(__file__))
         # Images directory
         self.IMG_PATH = os.path.join(self.BASE_PATH, "../dependencies/images/")
-        # Near offsets of grid tiles
-        self.NEAR_OFFSETS = [(0, 0), (0, 1), (0, -1), (-1, -1), (-1, 0), (-1, 1),
-                             (1, -1), (1, 0), (1, 1)]
+        # Directory of the cached texture atlases
+        self.CACHE_PATH = os.path.join(self.BASE_PATH, "../dependencies/cache/")
         # Tiles affected by physics
         self.PHYSICS_TILES = {"grass", "cobblestone"}
         # Tiles that can be affected by auto-tiling
         self.AUTO_TILE_TILES = {"grass", "cobblestone"}
         # Render scale for rendering surface
         self.RENDER_SCALE = 2
+        # Texture atlases of the image directories
+        self.atlas = TextureAtlas(self.IMG_PATH, self.CACHE_PATH)
 
         # Auto tile rules
         self.AUTO_TILE_RULES = {
@@ -46,9 +49,5 @@ class Utilities:
         return image
 
     def load_images(self, directory):
-        """Load multiple images"""
-        images = []
-        # Go through every image in directory, load it and append to the images list
-        for image in os.listdir(self.IMG_PATH + directory):
-            images.append(self.load_image(directory + '/' + image))
-        return images
+        """Load multiple images in numeric order, they are packed in one cached texture atlas"""
+        return self.atlas.load(directory)